@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post
+from .models import (AuthorStats, Comment, Follow, Group, Post, PostScore,
+                     TimelineEntry)
 
 
 @admin.register(Post)
@@ -30,3 +31,22 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ("post", "author", "text", "created",)
     search_fields = ("author", "post", "text", "created",)
     list_filter = ("created",)
+
+
+@admin.register(TimelineEntry)
+class TimelineEntryAdmin(admin.ModelAdmin):
+    list_display = ("user", "post", "pub_date",)
+    list_filter = ("pub_date",)
+
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    list_display = ("user", "posts_count", "followers_count",
+                    "following_count",)
+    search_fields = ("user__username",)
+
+
+@admin.register(PostScore)
+class PostScoreAdmin(admin.ModelAdmin):
+    list_display = ("post", "score",)
+    ordering = ("-score",)
@@ -0,0 +1,165 @@
+"""JSON API для чтения лент и постов.
+
+Ответ содержит только поля из ?fields=id,text,... (по умолчанию - все
+из FIELDS). ETag и Last-Modified считаются так же, как для страниц
+(см. conditional), поэтому повторный запрос неизменившейся ленты
+получает 304 без выборки постов."""
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition, require_safe
+
+from yatube.settings import PAGINATOR_NUMBER
+
+from . import feed_cache, timeline
+from .conditional import (follow_state, group_last_modified, group_scopes,
+                          group_state, index_last_modified, index_scopes,
+                          index_state, last_comment, make_etag,
+                          post_last_modified, post_scopes, post_state,
+                          profile_last_modified, profile_scopes,
+                          profile_state, scopes_etag)
+from .models import Group, Post
+from .paginator import CursorPaginator
+
+User = get_user_model()
+
+FIELDS = {
+    "id": lambda post: post.id,
+    "text": lambda post: post.text,
+    "pub_date": lambda post: post.pub_date,
+    "author": lambda post: post.author.username,
+    "group": lambda post: post.group.slug if post.group_id else None,
+    "image": lambda post: post.image.url if post.image else None,
+    "comment_count": lambda post: post.comment_count,
+}
+RELATED = {"author": "author", "group": "group"}
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def api_view(etag_func, last_modified_func):
+    """GET/HEAD с проверкой If-None-Match и If-Modified-Since;
+    ответы можно хранить, но перед использованием нужно перепроверить"""
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag_func,
+            last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ("Cookie",))
+            return response
+        return require_safe(wrapper)
+    return decorator
+
+
+def _follow_etag(request):
+    # Подписка и отписка поднимают версию области читателя,
+    # а подписка в другом воркере видна по id последней подписки
+    if not request.user.is_authenticated:
+        return None
+    versions = feed_cache.get_versions([
+        feed_cache.ALL_POSTS, feed_cache.author_scope(request.user.pk)])
+    return make_etag(request.user.pk, follow_state(request),
+                     last_comment(request), versions,
+                     request.get_full_path())
+
+
+def _follow_last_modified(request):
+    if not request.user.is_authenticated:
+        return None
+    return follow_state(request)["latest"]
+
+
+@api_view(scopes_etag(index_scopes, index_state), index_last_modified)
+def index(request):
+    return _feed(request, Post.objects.all())
+
+
+@api_view(scopes_etag(group_scopes, group_state), group_last_modified)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return _error("Группа не найдена", 404)
+    return _feed(request, group.posts.all())
+
+
+@api_view(scopes_etag(profile_scopes, profile_state), profile_last_modified)
+def profile(request, username):
+    author = User.objects.filter(username__ciexact=username).first()
+    if author is None:
+        return _error("Автор не найден", 404)
+    return _feed(request, author.posts.all())
+
+
+@api_view(_follow_etag, _follow_last_modified)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error("Нужно войти на сайт", 401)
+    return _feed(request, timeline.feed(request.user),
+                 ordering=timeline.FEED_ORDERING)
+
+
+@api_view(scopes_etag(post_scopes, post_state), post_last_modified)
+def post_detail(request, post_id):
+    try:
+        fields = _fields(request)
+    except FieldsError as error:
+        return _error(str(error), 400)
+    post = _select(Post.objects.filter(pk=post_id), fields).first()
+    if post is None:
+        return _error("Пост не найден", 404)
+    return _json(_serialize(post, fields))
+
+
+def _feed(request, post_list, ordering=("-pub_date", "-id")):
+    try:
+        fields = _fields(request)
+    except FieldsError as error:
+        return _error(str(error), 400)
+    paginator = CursorPaginator(_select(post_list, fields),
+                                PAGINATOR_NUMBER, ordering=ordering)
+    page = paginator.paginate(request.GET)
+    return _json({
+        "results": [_serialize(post, fields) for post in page],
+        "next": page.next_cursor,
+        "previous": page.previous_cursor,
+    })
+
+
+def _fields(request):
+    requested = request.GET.get("fields")
+    if not requested:
+        return tuple(FIELDS)
+    fields = tuple(dict.fromkeys(
+        field.strip() for field in requested.split(",") if field.strip()))
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise FieldsError(f"Неизвестные поля: {', '.join(unknown)}")
+    return fields
+
+
+def _select(post_list, fields):
+    related = [RELATED[field] for field in fields if field in RELATED]
+    return post_list.select_related(*related) if related else post_list
+
+
+def _serialize(post, fields):
+    return {field: FIELDS[field](post) for field in fields}
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={
+        "ensure_ascii": False,
+        "separators": (",", ":"),
+    })
+
+
+def _error(detail, status):
+    return _json({"detail": detail}, status=status)
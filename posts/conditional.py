@@ -0,0 +1,157 @@
+"""ETag и Last-Modified для условных запросов к лентам и постам.
+
+ETag строится из версий областей кэша лент (см. feed_cache) и из
+дешёвых меток базы: даты последнего поста области и id последнего
+комментария - обе берутся из индекса, без подсчёта строк. Версии
+меняются при любом изменении поста, комментария или счётчиков автора,
+но живут в кэше по умолчанию, а он без CACHE_BACKEND у каждого
+воркера свой; метки из базы общие для всех воркеров, поэтому новый
+пост или комментарий меняет ETag, какой бы воркер ни обработал запись.
+Правки и удаления другие воркеры замечают только через общий кэш.
+Last-Modified - дата последнего поста или комментария; она не
+замечает правок и удалений, поэтому Django проверяет её, только
+если клиент не прислал If-None-Match."""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+
+from . import feed_cache
+from .models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+def scopes_etag(scopes_for, state_for):
+    """ETag из версий областей, которые scopes_for(request, *args,
+    **kwargs) возвращает для запроса (None - страницы нет), и из
+    состояния базы, которое возвращает state_for с теми же аргументами"""
+    def etag(request, *args, **kwargs):
+        scopes = scopes_for(request, *args, **kwargs)
+        if scopes is None:
+            return None
+        return make_etag(feed_cache.get_versions(scopes),
+                         state_for(request, *args, **kwargs),
+                         request.get_full_path())
+    return etag
+
+
+def make_etag(*parts):
+    raw = ":".join(str(part) for part in parts)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def latest(queryset, field="pub_date"):
+    return queryset.aggregate(latest=Max(field))["latest"]
+
+
+def index_scopes(request):
+    return [feed_cache.ALL_POSTS]
+
+
+def group_scopes(request, slug):
+    group_id = _group_id(request, slug)
+    return None if group_id is None else [feed_cache.group_scope(group_id)]
+
+
+def profile_scopes(request, username):
+    author_id = _author_id(request, username)
+    return None if author_id is None else [feed_cache.author_scope(author_id)]
+
+
+def post_scopes(request, post_id, username=None):
+    post = _post(request, post_id, username)
+    return None if post is None else [feed_cache.author_scope(post[0])]
+
+
+def index_state(request):
+    return _feed_state(request, "index", None, Post.objects.all())
+
+
+def group_state(request, slug):
+    group_id = _group_id(request, slug)
+    return _feed_state(request, "group", group_id,
+                       Post.objects.filter(group_id=group_id))
+
+
+def profile_state(request, username):
+    author_id = _author_id(request, username)
+    return _feed_state(request, "author", author_id,
+                       Post.objects.filter(author_id=author_id))
+
+
+def post_state(request, post_id, username=None):
+    return _memo(request, "comments", post_id, lambda: Comment.objects.filter(
+        post_id=post_id).aggregate(latest=Max("created"), last=Max("id")))
+
+
+def follow_state(request):
+    user_id = request.user.pk
+    return _memo(request, "follow", user_id, lambda: {
+        "latest": latest(TimelineEntry.objects.filter(user_id=user_id)),
+        "followed": Follow.objects.filter(user_id=user_id).aggregate(
+            last=Max("id"))["last"],
+    })
+
+
+def index_last_modified(request):
+    return index_state(request)["latest"]
+
+
+def group_last_modified(request, slug):
+    if _group_id(request, slug) is None:
+        return None
+    return group_state(request, slug)["latest"]
+
+
+def profile_last_modified(request, username):
+    return profile_state(request, username)["latest"]
+
+
+def post_last_modified(request, post_id, username=None):
+    post = _post(request, post_id, username)
+    if post is None:
+        return None
+    commented = post_state(request, post_id, username)["latest"]
+    return max(post[1], commented) if commented else post[1]
+
+
+def last_comment(request):
+    """id последнего комментария: меняется с каждым новым
+    комментарием и читается из первичного ключа за один шаг"""
+    return _memo(request, "comment", None, lambda: Comment.objects.aggregate(
+        last=Max("id"))["last"])
+
+
+def _feed_state(request, kind, key, posts):
+    latest = _memo(request, f"{kind}_latest", key,
+                   lambda: posts.aggregate(latest=Max("pub_date")))
+    return {**latest, "comment": last_comment(request)}
+
+
+def _group_id(request, slug):
+    return _memo(request, "group", slug, lambda: Group.objects.filter(
+        slug=slug).values_list("id", flat=True).first())
+
+
+def _author_id(request, username):
+    return _memo(request, "author", username, lambda: User.objects.filter(
+        username__ciexact=username).values_list("id", flat=True).first())
+
+
+def _post(request, post_id, username):
+    def author_and_date():
+        posts = Post.objects.filter(pk=post_id)
+        if username is not None:
+            posts = posts.filter(author__username__ciexact=username)
+        return posts.values_list("author_id", "pub_date").first()
+    return _memo(request, "post", post_id, author_and_date)
+
+
+def _memo(request, kind, key, load):
+    """ETag и Last-Modified считаются отдельными функциями; общие
+    для них поиски выполняются один раз за запрос"""
+    memo = request.__dict__.setdefault("_conditional", {})
+    if (kind, key) not in memo:
+        memo[kind, key] = load()
+    return memo[kind, key]
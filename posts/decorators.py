@@ -1,6 +1,12 @@
+from functools import wraps
+
 from django.contrib.auth import get_user_model
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from yatube.settings import PUBLIC_PAGE_MAX_AGE
 
 from .models import Post, User
 
@@ -21,3 +27,37 @@ def check_user_is_author(func):
                                 )
                         )
     return check_user
+
+
+def public_page(etag_func, last_modified_func):
+    """Условные ответы (304) для анонимных посетителей.
+
+    Их страницы одинаковы для всех и помечаются как public
+    на PUBLIC_PAGE_MAX_AGE секунд; страницы вошедших пользователей
+    содержат их кнопки и формы (в лентах - собираются из общей
+    заготовки page_cache) и помечаются как private"""
+    def anonymous_only(func):
+        @wraps(func)
+        def wrapper(request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return None
+            return func(request, *args, **kwargs)
+        return wrapper
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=anonymous_only(etag_func),
+            last_modified_func=anonymous_only(last_modified_func))(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True)
+            else:
+                patch_cache_control(response, public=True,
+                                    max_age=PUBLIC_PAGE_MAX_AGE)
+            patch_vary_headers(response, ("Cookie",))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,96 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from yatube.settings import FEED_CACHE_FRESH, FEED_CACHE_LOCK, FEED_CACHE_STALE
+
+ALL_POSTS = "all"
+LOCK_WAIT = 0.5
+LOCK_POLL = 0.05
+
+
+def group_scope(group_id):
+    return f"group:{group_id}"
+
+
+def author_scope(author_id):
+    return f"author:{author_id}"
+
+
+def post_scopes(group_id, author_id):
+    """Области кэша, которые затрагивает изменение поста"""
+    scopes = [ALL_POSTS, author_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    return scopes
+
+
+def bump(*scopes):
+    """Увеличивает версии областей, делая их кэш устаревшим"""
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def get_versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_or_render(scopes, vary_on, render):
+    """Возвращает закэшированный HTML ленты или строит его заново.
+
+    Фрагмент свежий, пока не изменилась ни одна версия областей
+    и не прошло FEED_CACHE_FRESH секунд. Пересчитывает только тот запрос,
+    кто взял блокировку; остальные тем временем получают устаревшую
+    копию, а если её нет - ждут результата не дольше LOCK_WAIT секунд."""
+    key = _fragment_key(scopes, vary_on)
+    versions = get_versions(scopes)
+    entry = cache.get(key)
+    if _is_fresh(entry, versions):
+        return entry["html"]
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, FEED_CACHE_LOCK):
+        try:
+            html = render()
+            cache.set(key, {
+                "versions": versions,
+                "expires": time.time() + FEED_CACHE_FRESH,
+                "html": html,
+            }, FEED_CACHE_STALE)
+        finally:
+            cache.delete(lock_key)
+        return html
+    if entry is not None:
+        return entry["html"]
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["html"]
+    return render()
+
+
+def _is_fresh(entry, versions):
+    return (entry is not None
+            and entry["versions"] == versions
+            and entry["expires"] > time.time())
+
+
+def _version_key(scope):
+    return f"posts:version:{scope}"
+
+
+def _fragment_key(scopes, vary_on):
+    raw = ":".join(str(part) for part in (*scopes, *vary_on))
+    return "feed:" + hashlib.md5(raw.encode()).hexdigest()
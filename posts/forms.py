@@ -1,6 +1,7 @@
 from django import forms
 
 from .models import Comment, Post
+from .uploads import RejectedUpload
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +9,23 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ("text", "group", "image")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = {
+            name: upload.error for name, upload in self.files.items()
+            if isinstance(upload, RejectedUpload)
+        }
+        if self.upload_errors:
+            self.files = self.files.copy()
+            for name in self.upload_errors:
+                del self.files[name]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for name, error in self.upload_errors.items():
+            self.add_error(name, error)
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,45 @@
+"""Общие части команд замера: временная база, сводка задержек
+и вывод JSON-отчёта"""
+import json
+import statistics
+from contextlib import contextmanager
+
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+
+
+@contextmanager
+def test_databases():
+    """Поднимает тестовое окружение с временной базой
+    и удаляет её после замера"""
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу; для пустого замера 0"""
+    ordered = sorted(values) or [0]
+    return ordered[round(percent / 100 * (len(ordered) - 1))]
+
+
+def latency_stats(latencies):
+    """p50 и p95 задержек в миллисекундах"""
+    return {
+        "p50_ms": round(statistics.median(latencies or [0]), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+    }
+
+
+def write_report(command, report, output=None):
+    """Пишет отчёт в файл output, а без него в stdout команды"""
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        command.stdout.write(text)
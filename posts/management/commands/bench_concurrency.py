@@ -0,0 +1,99 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.urls import reverse
+
+from posts.management.bench import latency_stats, write_report
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+MARKER = "bench_concurrency"
+
+
+class Command(BaseCommand):
+    help = ("Замеряет, сколько запросов к главной странице в секунду "
+            "обслуживают читающие потоки, пока другие потоки добавляют "
+            "комментарии. Работает с текущей базой: сначала заполните "
+            "её командой seed_load")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--output", default=None,
+                            help="Файл для JSON-отчёта (по умолчанию stdout)")
+
+    def handle(self, *args, **options):
+        self.post = Post.objects.select_related("author").order_by(
+            "-id").first()
+        self.user = User.objects.order_by("id").first()
+        if self.post is None or self.user is None:
+            self.stderr.write("Нет данных: сначала запустите seed_load")
+            return
+        self.results = {"read": [], "write": []}
+        self.errors = {"read": 0, "write": 0}
+        self.lock = threading.Lock()
+        self.deadline = time.perf_counter() + options["seconds"]
+        threads = (
+            [threading.Thread(target=self.worker, args=("read",))
+             for _ in range(options["readers"])]
+            + [threading.Thread(target=self.worker, args=("write",))
+               for _ in range(options["writers"])]
+        )
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        Comment.objects.filter(text=MARKER).delete()
+        self.report(options)
+
+    def worker(self, kind):
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(self.user)
+        if kind == "read":
+            url, data = reverse("posts:index"), None
+        else:
+            url = reverse("posts:add_comment",
+                          args=(self.post.author.username, self.post.id))
+            data = {"text": MARKER}
+        try:
+            while time.perf_counter() < self.deadline:
+                start = time.perf_counter()
+                try:
+                    if data is None:
+                        failed = client.get(url).status_code >= 500
+                    else:
+                        failed = client.post(url, data).status_code >= 500
+                except Exception:
+                    failed = True
+                elapsed = (time.perf_counter() - start) * 1000
+                with self.lock:
+                    self.results[kind].append(elapsed)
+                    self.errors[kind] += failed
+        finally:
+            close_old_connections()
+
+    def report(self, options):
+        report = {"engine": connection.settings_dict["ENGINE"]}
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                report["journal_mode"] = cursor.fetchone()[0]
+        report.update({
+            "readers": options["readers"],
+            "writers": options["writers"],
+            "seconds": options["seconds"],
+        })
+        for kind, latencies in self.results.items():
+            report[kind] = {
+                "requests": len(latencies),
+                "errors": self.errors[kind],
+                "per_second": round(len(latencies) / options["seconds"], 1),
+                **latency_stats(latencies),
+            }
+        write_report(self, report, options["output"])
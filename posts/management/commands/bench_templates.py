@@ -0,0 +1,86 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory, override_settings
+
+from posts.feed_cache import ALL_POSTS
+from posts.management.bench import (latency_stats, test_databases,
+                                    write_report)
+from posts.models import Post
+from posts.paginator import CursorPaginator
+from posts.seeding import seed
+from yatube.settings import PAGINATOR_NUMBER
+from yatube.template_cache import precompile
+
+LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+DUMMY_CACHE = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+
+
+class Command(BaseCommand):
+    help = ("Замеряет отрисовку шаблона главной страницы с 10 постами "
+            "обычными загрузчиками и кэширующим загрузчиком после "
+            "предварительного разбора шаблонов. Кэш лент на время "
+            "замера отключён, чтобы каждый раз отрисовывались все посты")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--renders", type=int, default=200,
+                            help="Отрисовок на каждый вариант")
+        parser.add_argument("--output", default=None,
+                            help="Файл для JSON-отчёта (по умолчанию stdout)")
+
+    def handle(self, *args, **options):
+        with test_databases(), override_settings(CACHES=DUMMY_CACHE):
+            report = self.run(options)
+        write_report(self, report, options["output"])
+
+    def run(self, options):
+        seed(5, PAGINATOR_NUMBER, 2, 3, prefix="bench", seed_value=0)
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        paginator = CursorPaginator(
+            Post.objects.select_related("author", "group"), PAGINATOR_NUMBER)
+        context = {
+            "page": paginator.paginate({}),
+            "path": "home",
+            "feed_scopes": [ALL_POSTS],
+        }
+        report = {"renders": options["renders"]}
+        plain = self.backend("plain", LOADERS)
+        report["filesystem"] = self.measure(plain, context, request,
+                                            options["renders"])
+        cached = self.backend("cached", [
+            ("django.template.loaders.cached.Loader", LOADERS)])
+        start = time.perf_counter()
+        report["precompiled_templates"] = precompile(cached.engine)
+        report["precompile_ms"] = round(
+            (time.perf_counter() - start) * 1000, 3)
+        report["cached"] = self.measure(cached, context, request,
+                                        options["renders"])
+        return report
+
+    @staticmethod
+    def backend(name, loaders):
+        params = settings.TEMPLATES[0]
+        return DjangoTemplates({
+            "NAME": name,
+            "DIRS": params["DIRS"],
+            "APP_DIRS": False,
+            "OPTIONS": {**params["OPTIONS"], "loaders": loaders},
+        })
+
+    @staticmethod
+    def measure(backend, context, request, renders):
+        latencies = []
+        for _ in range(renders):
+            start = time.perf_counter()
+            backend.get_template("index.html").render(context, request)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latency_stats(latencies)
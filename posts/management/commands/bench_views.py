@@ -0,0 +1,137 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from posts.management.bench import (latency_stats, test_databases,
+                                    write_report)
+from posts.models import Follow, Group, Post
+from posts.seeding import seed
+
+
+class QueryRecorder:
+    """Обёртка выполнения запросов: запоминает SQL и параметры,
+    чтобы после замера посчитать число выбранных строк"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    def rows_fetched(self):
+        rows = 0
+        with connection.cursor() as cursor:
+            for sql, params in self.queries:
+                if not sql.lstrip().upper().startswith("SELECT"):
+                    continue
+                cursor.execute(f"SELECT COUNT(*) FROM ({sql}) AS bench",
+                               params)
+                rows += cursor.fetchone()[0]
+        return rows
+
+
+class Command(BaseCommand):
+    help = ("Заполняет временную базу синтетическими данными и замеряет "
+            "задержку, число SQL-запросов и выбранных строк "
+            "для каждого адреса posts")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--posts", type=int, default=500)
+        parser.add_argument("--follows", type=int, default=10,
+                            help="Подписок на одного пользователя")
+        parser.add_argument("--comments", type=int, default=3,
+                            help="Комментариев на один пост")
+        parser.add_argument("--requests", type=int, default=20,
+                            help="Запросов на каждый адрес")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default=None,
+                            help="Файл для JSON-отчёта (по умолчанию stdout)")
+
+    def handle(self, *args, **options):
+        with test_databases():
+            report = self.run(options)
+        write_report(self, report, options["output"])
+
+    def run(self, options):
+        users = seed(options["users"], options["posts"], options["follows"],
+                     options["comments"], prefix="bench",
+                     seed_value=options["seed"])
+        client = Client()
+        reader = users[0]
+        client.force_login(reader)
+        results = []
+        for name, method, url, prepare in self.routes(reader):
+            latencies = []
+            for _ in range(options["requests"]):
+                prepare()
+                start = time.perf_counter()
+                response = getattr(client, method)(url)
+                latencies.append((time.perf_counter() - start) * 1000)
+            prepare()
+            recorder = QueryRecorder()
+            with connection.execute_wrapper(recorder):
+                getattr(client, method)(url)
+            results.append({
+                "route": name,
+                "method": method.upper(),
+                "url": url,
+                "status": response.status_code,
+                **latency_stats(latencies),
+                "queries": len(recorder.queries),
+                "rows": recorder.rows_fetched(),
+            })
+        return {
+            "dataset": {key: options[key] for key in
+                        ("users", "posts", "follows", "comments", "seed")},
+            "requests": options["requests"],
+            "routes": results,
+        }
+
+    def routes(self, reader):
+        """Все адреса из posts/urls.py с подготовкой состояния
+        перед каждым запросом"""
+        own_post = Post.objects.filter(author=reader).first()
+        if own_post is None:
+            own_post = Post.objects.create(text="Запись читателя",
+                                           author=reader)
+        post = Post.objects.exclude(author=reader).first() or own_post
+        author = post.author
+        group = Group.objects.first()
+
+        def nothing():
+            pass
+
+        def unfollow():
+            Follow.objects.filter(user=reader, author=author).delete()
+
+        def follow():
+            Follow.objects.get_or_create(user=reader, author=author)
+
+        post_args = (post.author.username, post.id)
+        own_args = (reader.username, own_post.id)
+        return [
+            ("index", "get", reverse("posts:index"), nothing),
+            ("group_posts", "get",
+             reverse("posts:group_posts", args=(group.slug,)), nothing),
+            ("new_post", "get", reverse("posts:new_post"), nothing),
+            ("profile", "get",
+             reverse("posts:profile", args=(author.username,)), nothing),
+            ("post", "get", reverse("posts:post", args=post_args), nothing),
+            ("post_edit", "get",
+             reverse("posts:post_edit", args=own_args), nothing),
+            ("add_comment", "get",
+             reverse("posts:add_comment", args=post_args), nothing),
+            ("follow_index", "get", reverse("posts:follow_index"), nothing),
+            ("my_follows", "get", reverse("posts:my_follows"), nothing),
+            ("profile_follow", "get",
+             reverse("posts:profile_follow", args=(author.username,)),
+             unfollow),
+            ("profile_unfollow", "get",
+             reverse("posts:profile_unfollow", args=(author.username,)),
+             follow),
+        ]
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import BATCH_SIZE, export_records
+
+
+class Command(BaseCommand):
+    help = ("Выгружает пользователей, группы, посты, комментарии "
+            "и подписки в файл JSON Lines")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл выгрузки")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        with open(options["path"], "w", encoding="utf-8") as stream:
+            totals = export_records(stream, options["batch_size"])
+        summary = ", ".join(f"{label}: {count}"
+                            for label, count in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Выгружено - {summary}"))
@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+
+class Command(BaseCommand):
+    help = ("Строит варианты картинок (миниатюры разной ширины в WebP и JPEG) "
+            "для уже опубликованных постов")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--all", action="store_true",
+                            help="Перестроить и уже готовые варианты")
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image="").exclude(image__isnull=True)
+        if not options["all"]:
+            posts = posts.filter(image_variants="")
+        post_ids = list(posts.values_list("id", flat=True))
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            built = sum(1 for name in executor.map(self.build, post_ids)
+                        if name)
+        self.stdout.write(self.style.SUCCESS(
+            f"Построено миниатюр: {built} из {len(post_ids)}"))
+
+    @staticmethod
+    def build(post_id):
+        close_old_connections()
+        try:
+            return generate(post_id)
+        finally:
+            close_old_connections()
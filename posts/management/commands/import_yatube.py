@@ -0,0 +1,48 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import refresh_denormalized
+from posts.transfer import BATCH_SIZE, TransferError, import_records
+
+
+class Command(BaseCommand):
+    help = ("Загружает выгрузку export_yatube пачками bulk_create. "
+            "После каждой пачки номер строки сохраняется в файл "
+            "<путь>.checkpoint, и с --resume загрузка продолжается с него")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл выгрузки")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--resume", action="store_true",
+                            help="Продолжить с сохранённой строки")
+
+    def handle(self, *args, **options):
+        self.checkpoint = options["path"] + ".checkpoint"
+        skip = self.read_checkpoint() if options["resume"] else 0
+        if skip:
+            self.stdout.write(f"Продолжаем со строки {skip + 1}")
+        try:
+            with open(options["path"], encoding="utf-8") as lines:
+                totals = import_records(lines, options["batch_size"],
+                                        skip=skip, progress=self.progress)
+        except TransferError as error:
+            raise CommandError(error)
+        refresh_denormalized()
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        summary = ", ".join(f"{label}: {count}"
+                            for label, count in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Загружено - {summary}"))
+
+    def progress(self, label, loaded, line_number):
+        with open(self.checkpoint, "w") as checkpoint:
+            checkpoint.write(str(line_number))
+        self.stdout.write(f"{label}: {loaded}")
+
+    def read_checkpoint(self):
+        try:
+            with open(self.checkpoint) as checkpoint:
+                return int(checkpoint.read())
+        except (OSError, ValueError):
+            return 0
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает статистику авторов (записи, подписчики, подписки)"
+
+    def handle(self, *args, **options):
+        total = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Статистика пересчитана для {total} пользователей"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Строит поисковый индекс постов заново"
+
+    def handle(self, *args, **options):
+        total = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Проиндексировано постов: {total}"))
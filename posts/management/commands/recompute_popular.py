@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.popularity import recompute
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает рейтинги ленты популярного; "
+            "рассчитана на запуск по расписанию (cron)")
+
+    def handle(self, *args, **options):
+        total = recompute()
+        self.stdout.write(self.style.SUCCESS(
+            f"Рейтинги пересчитаны для {total} постов"))
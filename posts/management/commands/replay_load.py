@@ -0,0 +1,156 @@
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import Client
+from django.urls import reverse
+
+from posts.management.bench import latency_stats, write_report
+from posts.models import Group, Post
+from posts.seeding import WORDS
+
+User = get_user_model()
+
+HOT_POSTS = 2000
+
+# Доли чтений и записей внутри своей группы
+READS = {
+    "index": 30,
+    "group_posts": 10,
+    "profile": 15,
+    "post": 25,
+    "follow_index": 12,
+    "search": 8,
+}
+WRITES = {
+    "new_post": 30,
+    "add_comment": 50,
+    "profile_follow": 10,
+    "profile_unfollow": 10,
+}
+
+
+class Command(BaseCommand):
+    help = ("Нагружает адреса posts смесью чтений и записей из нескольких "
+            "потоков от имени пользователей seed_load и сообщает "
+            "пропускную способность и задержки")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--requests", type=int, default=1000,
+                            help="Всего запросов на все потоки")
+        parser.add_argument("--writes", type=float, default=0.1,
+                            help="Доля запросов на запись")
+        parser.add_argument("--anonymous", type=float, default=0.3,
+                            help="Доля чтений без входа на сайт")
+        parser.add_argument("--prefix", default="load",
+                            help="Префикс пользователей seed_load")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--output", default=None,
+                            help="Файл для JSON-отчёта (по умолчанию stdout)")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.usernames = list(User.objects.filter(
+            username__startswith=f"{options['prefix']}_user_").values_list(
+                "username", flat=True)[:1000])
+        self.posts = list(Post.objects.order_by("-id").values_list(
+            "id", "author__username")[:HOT_POSTS])
+        self.groups = list(Group.objects.values_list("slug", flat=True))
+        if not self.usernames or not self.posts:
+            self.stderr.write("Нет данных: сначала запустите seed_load")
+            return
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        per_thread = options["requests"] // options["threads"]
+        threads = [threading.Thread(target=self.worker,
+                                    args=(number, per_thread))
+                   for number in range(options["threads"])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        self.report(elapsed, per_thread * options["threads"])
+
+    def worker(self, number, requests):
+        seed = self.options["seed"]
+        rnd = random.Random(None if seed is None else seed + number)
+        user = User.objects.get(username=rnd.choice(self.usernames))
+        member = Client(SERVER_NAME="localhost")
+        member.force_login(user)
+        anonymous = Client(SERVER_NAME="localhost")
+        try:
+            for _ in range(requests):
+                write = rnd.random() < self.options["writes"]
+                mix = WRITES if write else READS
+                name = rnd.choices(list(mix), weights=list(mix.values()))[0]
+                client = member
+                if not write and name != "follow_index" and (
+                        rnd.random() < self.options["anonymous"]):
+                    client = anonymous
+                start = time.perf_counter()
+                try:
+                    response = self.request(client, name, rnd)
+                    failed = response.status_code >= 500
+                except Exception:
+                    failed = True
+                elapsed = (time.perf_counter() - start) * 1000
+                with self.lock:
+                    self.latencies[name].append(elapsed)
+                    if failed:
+                        self.errors[name] += 1
+        finally:
+            close_old_connections()
+
+    def request(self, client, name, rnd):
+        post_id, author = rnd.choice(self.posts)
+        if name == "index":
+            return client.get(reverse("posts:index"))
+        if name == "group_posts" and self.groups:
+            return client.get(reverse("posts:group_posts",
+                                      args=(rnd.choice(self.groups),)))
+        if name == "profile":
+            return client.get(reverse("posts:profile", args=(author,)))
+        if name == "follow_index":
+            return client.get(reverse("posts:follow_index"))
+        if name == "search":
+            return client.get(reverse("posts:search"),
+                              {"q": rnd.choice(WORDS)})
+        if name == "new_post":
+            return client.post(reverse("posts:new_post"),
+                               {"text": f"Нагрузка {rnd.choice(WORDS)}"})
+        if name == "add_comment":
+            return client.post(
+                reverse("posts:add_comment", args=(author, post_id)),
+                {"text": f"Нагрузка {rnd.choice(WORDS)}"})
+        if name in ("profile_follow", "profile_unfollow"):
+            return client.get(reverse(f"posts:{name}",
+                                      args=(rnd.choice(self.usernames),)))
+        return client.get(reverse("posts:post", args=(author, post_id)))
+
+    def report(self, elapsed, total):
+        routes = []
+        for name, latencies in sorted(self.latencies.items()):
+            routes.append({
+                "route": name,
+                "requests": len(latencies),
+                "errors": self.errors[name],
+                **latency_stats(latencies),
+            })
+        report = {
+            "threads": self.options["threads"],
+            "writes": self.options["writes"],
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "seconds": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 1) if elapsed else None,
+            "routes": routes,
+        }
+        write_report(self, report, self.options["output"])
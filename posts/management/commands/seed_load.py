@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import seed_load
+
+
+class Command(BaseCommand):
+    help = ("Заполняет базу синтетическими пользователями, подписками, "
+            "постами и комментариями со степенными распределениями")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--follows", type=int, default=20,
+                            help="Среднее число подписок пользователя")
+        parser.add_argument("--comments", type=int, default=3,
+                            help="Среднее число комментариев к посту")
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument("--days", type=int, default=365,
+                            help="За сколько последних дней идут посты")
+        parser.add_argument("--alpha", type=float, default=1.2,
+                            help="Показатель степенного закона, больше 1")
+        parser.add_argument("--prefix", default="load")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options["alpha"] <= 1:
+            raise CommandError("--alpha должен быть больше 1")
+        start = time.perf_counter()
+        seed_load(options["users"], options["posts"], options["follows"],
+                  options["comments"], groups=options["groups"],
+                  days=options["days"], alpha=options["alpha"],
+                  prefix=options["prefix"], seed_value=options["seed"],
+                  progress=self.progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {time.perf_counter() - start:.1f} с"))
+
+    def progress(self, label, count):
+        self.stdout.write(f"{label}: {count}")
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.http import QueryDict
+from django.test import RequestFactory
+from django.urls import reverse
+
+from posts import views
+from posts.models import Group, Post
+from posts.paginator import CursorPaginator
+from yatube.settings import PAGINATOR_NUMBER
+
+
+class Command(BaseCommand):
+    help = ("Заполняет кэш лент: первые страницы главной "
+            "и страницы самых больших групп")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=3,
+                            help="Сколько первых страниц прогревать")
+        parser.add_argument("--groups", type=int, default=5,
+                            help="Сколько самых больших групп прогревать")
+
+    def handle(self, *args, **options):
+        self.factory = RequestFactory()
+        warmed = self.warm(reverse("posts:index"), Post.objects.all(),
+                           views.index, options["pages"])
+        groups = Group.objects.annotate(
+            posts_total=Count("posts")).order_by(
+                "-posts_total")[:options["groups"]]
+        for group in groups:
+            warmed += self.warm(
+                reverse("posts:group_posts", args=(group.slug,)),
+                group.posts.all(),
+                views.group_posts,
+                options["pages"],
+                slug=group.slug
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Прогрето страниц: {warmed}"))
+
+    def warm(self, url, post_list, view, pages, **kwargs):
+        """Рендерит страницы ленты так, как их запрашивает анонимный
+        пользователь, переходя по ссылкам «Следующая»"""
+        paginator = CursorPaginator(post_list, PAGINATOR_NUMBER)
+        params = QueryDict(mutable=True)
+        for number in range(pages):
+            request = self.factory.get(url, params)
+            request.user = AnonymousUser()
+            view(request, **kwargs)
+            page = paginator.paginate(params)
+            if page.next_cursor is None:
+                return number + 1
+            params = QueryDict(mutable=True)
+            params["after"] = page.next_cursor
+        return pages
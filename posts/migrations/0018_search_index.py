@@ -0,0 +1,67 @@
+# Generated by Django 2.2.6 on 2026-10-18 19:50
+
+import math
+import re
+from collections import Counter
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+from posts.stemmer import stem
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def build_index(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    use_fts = schema_editor.connection.vendor == 'sqlite'
+    if use_fts:
+        try:
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(body)')
+        except OperationalError:
+            # SQLite собран без FTS5 - остаётся таблица SearchTerm
+            use_fts = False
+    for pk, text in Post.objects.values_list('pk', 'text').iterator():
+        words = [stem(word)[:64] for word in re.findall(r'\w+', text)]
+        if use_fts:
+            schema_editor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [pk, ' '.join(words)])
+            continue
+        counts = Counter(words)
+        length = math.sqrt(sum(counts.values()) or 1)
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, post_id=pk, weight=count / length)
+            for term, count in counts.items())
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('weight', models.FloatField(verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Термин поиска',
+                'verbose_name_plural': 'Термины поиска',
+                'unique_together': {('term', 'post')},
+            },
+        ),
+        migrations.RunPython(build_index, drop_index),
+    ]
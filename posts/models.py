@@ -1,5 +1,11 @@
+import json
+
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db import models
+from django.utils.functional import cached_property
+
+from .storage import image_storage
 
 User = get_user_model()
 
@@ -36,17 +42,67 @@ class Post(models.Model):
                               blank=True,
                               null=True)
     image = models.ImageField(upload_to="posts/", blank=True, null=True,
+                              storage=image_storage,
                               help_text="Загрузите картинку к посту",
                               verbose_name="Изображение",)
+    comment_count = models.PositiveIntegerField(
+        verbose_name="Количество комментариев",
+        default=0,
+        editable=False
+    )
+    image_variants = models.TextField(
+        verbose_name="Варианты изображения",
+        help_text="JSON: формат -> список пар (ширина, файл)",
+        blank=True,
+        editable=False
+    )
 
     class Meta:
         ordering = ("-pub_date",)
+        indexes = (
+            # -id повторяет второе поле сортировки CursorPaginator,
+            # иначе SQLite досортировывает страницу во временном B-дереве
+            models.Index(fields=("-pub_date", "-id"),
+                         name="post_pub_date_id_idx"),
+            models.Index(fields=("author", "-pub_date", "-id"),
+                         name="post_author_pub_date_id_idx"),
+            models.Index(fields=("group", "-pub_date", "-id"),
+                         name="post_group_pub_date_id_idx"),
+        )
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
 
     def __str__(self):
         return self.text[:15]
 
+    @cached_property
+    def variants(self):
+        try:
+            return json.loads(self.image_variants)
+        except ValueError:
+            return {}
+
+    @property
+    def thumbnail_url(self):
+        """Самый крупный JPEG - для браузеров без поддержки srcset"""
+        jpeg = self.variants.get("jpeg")
+        if not jpeg:
+            return ""
+        return default_storage.url(jpeg[-1][1])
+
+    @property
+    def jpeg_srcset(self):
+        return self._srcset("jpeg")
+
+    @property
+    def webp_srcset(self):
+        return self._srcset("webp")
+
+    def _srcset(self, image_format):
+        return ", ".join(
+            f"{default_storage.url(name)} {width}w"
+            for width, name in self.variants.get(image_format, ()))
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
@@ -60,6 +116,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ("-created",)
+        indexes = (
+            models.Index(fields=("post", "-created"),
+                         name="comment_post_created_idx"),
+        )
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
 
@@ -76,8 +136,90 @@ class Follow(models.Model):
 
     class Meta:
         ordering = ("user",)
+        unique_together = ("user", "author")
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
 
     def __str__(self):
         return f"Пописка позоателя {self.user} на автора {self.author}"
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: строка на каждую пару
+    подписчик - пост автора, на которого он подписан"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="timeline")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="timeline_entries")
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        ordering = ("-pub_date",)
+        unique_together = ("user", "post")
+        indexes = (
+            # -post повторяет второе поле сортировки ленты подписок
+            models.Index(fields=("user", "-pub_date", "-post"),
+                         name="timeline_user_date_post_idx"),
+        )
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+
+    def __str__(self):
+        return f"Пост {self.post_id} в ленте {self.user}"
+
+
+class AuthorStats(models.Model):
+    """Счётчики автора, которые показываются в карточке профиля"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name="stats")
+    posts_count = models.PositiveIntegerField(verbose_name="Записей",
+                                              default=0)
+    followers_count = models.PositiveIntegerField(
+        verbose_name="Подписчиков", default=0)
+    following_count = models.PositiveIntegerField(
+        verbose_name="Подписан", default=0)
+
+    class Meta:
+        verbose_name = "Статистика автора"
+        verbose_name_plural = "Статистика авторов"
+
+    def __str__(self):
+        return f"Статистика автора {self.user}"
+
+
+class PostScore(models.Model):
+    """Рейтинг поста для ленты популярного (см. posts.popularity)"""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name="popularity")
+    score = models.FloatField(verbose_name="Рейтинг")
+
+    class Meta:
+        verbose_name = "Рейтинг поста"
+        verbose_name_plural = "Рейтинги постов"
+        indexes = [
+            models.Index(fields=["-score", "-post"],
+                         name="post_score_idx"),
+        ]
+
+    def __str__(self):
+        return f"Рейтинг поста {self.post_id}: {self.score:.3f}"
+
+
+class SearchTerm(models.Model):
+    """Запись инвертированного индекса поиска: основа слова и её вес
+    в посте. Используется, когда база не поддерживает SQLite FTS5"""
+    term = models.CharField(max_length=64, verbose_name="Основа слова")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="search_terms",
+                             verbose_name="Пост")
+    weight = models.FloatField(verbose_name="Вес")
+
+    class Meta:
+        verbose_name = "Термин поиска"
+        verbose_name_plural = "Термины поиска"
+        unique_together = ("term", "post")
+
+    def __str__(self):
+        return self.term
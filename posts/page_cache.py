@@ -0,0 +1,115 @@
+"""Кэш целых страниц лент с «дырками» под данные пользователя.
+
+Страница отрисовывается один раз от имени анонимного посетителя;
+части, зависящие от пользователя (меню, кнопки подписки, ссылки
+на редактирование), вместо HTML оставляют метки тега {% hole %}.
+Заготовка хранится в кэше лент (см. feed_cache) и устаревает вместе
+с версиями областей страницы. На каждый запрос метки заменяются
+маленькими шаблонами, отрисованными для текущего пользователя;
+анонимная страница целиком хранится отдельно."""
+import base64
+import json
+import re
+from functools import wraps
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.template.loader import get_template
+
+from . import feed_cache
+from .paginator import PAGE_PARAMS
+
+HOLE = re.compile(r"<!--hole:([A-Za-z0-9_-]+)-->")
+
+
+class _NotCacheable(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def hole_marker(template_name, values):
+    raw = json.dumps([template_name, values], separators=(",", ":"))
+    token = base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    return f"<!--hole:{token}-->"
+
+
+def is_skeleton(request):
+    """Отрисовывается ли сейчас заготовка страницы для кэша"""
+    return getattr(request, "_page_skeleton", False)
+
+
+def fill_holes(html, request):
+    """Заменяет метки заготовки шаблонами для пользователя запроса"""
+    templates = {}
+    rendered = {}
+
+    def fill(match):
+        token = match.group(1)
+        if token not in rendered:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            template_name, values = json.loads(raw.decode())
+            if template_name not in templates:
+                templates[template_name] = get_template(template_name)
+            rendered[token] = templates[template_name].render(values,
+                                                              request)
+        return rendered[token]
+    return HOLE.sub(fill, html)
+
+
+def page_cache(scopes_for):
+    """Отдаёт GET-запросы из кэша страниц.
+
+    scopes_for(request, *args, **kwargs) возвращает области кэша
+    лент, от которых зависит страница, или None, если страницы нет;
+    тогда и при ответах кроме 200 представление работает как обычно"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            scopes = scopes_for(request, *args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            key = _page_key(request)
+
+            def skeleton():
+                return feed_cache.get_or_render(
+                    scopes, ("page", *key),
+                    lambda: _render_skeleton(view, request, args, kwargs))
+
+            try:
+                if request.user.is_authenticated:
+                    html = fill_holes(skeleton(), request)
+                else:
+                    html = feed_cache.get_or_render(
+                        scopes, ("page", "anonymous", *key),
+                        lambda: fill_holes(skeleton(), request))
+            except _NotCacheable as error:
+                return error.response
+            return HttpResponse(html)
+        return wrapper
+    return decorator
+
+
+def _page_key(request):
+    """Путь и только те параметры, от которых зависит лента:
+    прочие параметры строки запроса не плодят записей в кэше"""
+    params = (f"{name}={request.GET[name]}" for name in PAGE_PARAMS
+              if request.GET.get(name))
+    return (request.path, *params)
+
+
+def _render_skeleton(view, request, args, kwargs):
+    # Заготовка строится от имени анонимного посетителя, поэтому данные
+    # пользователя не попадут в кэш даже из шаблона без {% hole %}
+    user = request.user
+    request.user = AnonymousUser()
+    request._page_skeleton = True
+    try:
+        response = view(request, *args, **kwargs)
+    finally:
+        request.user = user
+        request._page_skeleton = False
+    if response.status_code != 200 or response.streaming:
+        raise _NotCacheable(response)
+    return response.content.decode(response.charset)
@@ -0,0 +1,191 @@
+import base64
+import json
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+
+# GET-параметры, которые читает CursorPaginator.paginate
+PAGE_PARAMS = ("after", "before", "page")
+# Старые ссылки ?page= дальше этой страницы не уходят: огромный номер
+# переполнил бы OFFSET в базе
+MAX_PAGE_NUMBER = 10 ** 6
+
+
+def page_number(value):
+    """Номер страницы из GET-параметра: не меньше 1
+    и не больше MAX_PAGE_NUMBER, мусор - первая страница"""
+    try:
+        return min(max(int(value), 1), MAX_PAGE_NUMBER)
+    except (TypeError, ValueError):
+        return 1
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (keyset): страницы выбираются условием
+    на значения полей сортировки последней показанной записи,
+    без COUNT(*) и OFFSET по всей таблице.
+
+    Ссылки передают непрозрачные токены ``?after=`` и ``?before=``;
+    старые ссылки ``?page=`` обслуживаются через OFFSET
+    для совместимости."""
+
+    def __init__(self, object_list, per_page,
+                 ordering=("-pub_date", "-id")):
+        self.ordering = tuple(ordering)
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+
+    def paginate(self, params):
+        """Возвращает страницу по GET-параметрам запроса"""
+        after = self.decode_cursor(params.get("after"))
+        if after is not None:
+            return self._page_after(after)
+        before = self.decode_cursor(params.get("before"))
+        if before is not None:
+            return self._page_before(before)
+        return self._page_by_number(params.get("page"))
+
+    def encode_cursor(self, obj):
+        values = [self._value(obj, field) for field in self._fields()]
+        raw = json.dumps(values, default=str).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, token):
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            values = json.loads(raw.decode())
+        except (ValueError, UnicodeDecodeError):
+            return None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            return None
+        # Значения из токена приводятся к типам полей сортировки:
+        # испорченный токен ведёт на первую страницу, а не в ORM
+        try:
+            values = [self._model_field(field).to_python(value)
+                      for field, value in zip(self._fields(), values)]
+        except (ValidationError, TypeError, ValueError):
+            return None
+        if any(value is None for value in values):
+            return None
+        return values
+
+    def _page_after(self, values):
+        rows = list(self.object_list.filter(
+            self._seek(values, forward=True))[:self.per_page + 1])
+        objects = rows[:self.per_page]
+        return self._make_page(
+            objects,
+            number=None,
+            has_previous=bool(objects),
+            has_next=len(rows) > self.per_page,
+            position=("after", *values)
+        )
+
+    def _page_before(self, values):
+        reverse_ordering = [self._reverse(field) for field in self.ordering]
+        rows = list(self.object_list.filter(
+            self._seek(values, forward=False)).order_by(
+                *reverse_ordering)[:self.per_page + 1])
+        objects = rows[:self.per_page][::-1]
+        return self._make_page(
+            objects,
+            number=None,
+            has_previous=len(rows) > self.per_page,
+            has_next=bool(objects),
+            position=("before", *values)
+        )
+
+    def _page_by_number(self, number):
+        number = page_number(number)
+        offset = (number - 1) * self.per_page
+        rows = list(self.object_list[offset:offset + self.per_page + 1])
+        objects = rows[:self.per_page]
+        return self._make_page(
+            objects,
+            number=number,
+            has_previous=number > 1 and bool(objects),
+            has_next=len(rows) > self.per_page,
+            position=("page", number)
+        )
+
+    def _make_page(self, objects, number, has_previous, has_next,
+                   position):
+        """Обычная Page (её тип проверяют шаблоны и тесты), методы
+        которой отвечают по уже выбранным записям, без COUNT(*).
+        Номер и позиции записей есть только у страниц ?page=;
+        страницы по курсору переходят по next_cursor и previous_cursor"""
+        page = Page(objects, number, self)
+        page.has_next = lambda: has_next
+        page.has_previous = lambda: has_previous
+        page.next_page_number = partial(_neighbour, number, has_next, 1)
+        page.previous_page_number = partial(_neighbour, number,
+                                            has_previous, -1)
+        first = last = None
+        if number is not None:
+            first = (number - 1) * self.per_page + 1 if objects else 0
+            last = first + len(objects) - 1 if objects else 0
+        page.start_index = lambda: first
+        page.end_index = lambda: last
+        # Разобранный курсор или номер: по нему, а не по строке
+        # запроса, кэшируются фрагменты страницы
+        page.position = position
+        page.previous_cursor = (self.encode_cursor(objects[0])
+                                if has_previous else None)
+        page.next_cursor = (self.encode_cursor(objects[-1])
+                            if has_next else None)
+        return page
+
+    def _seek(self, values, forward):
+        """Условие «строго после» (или «строго до») курсора
+        в лексикографическом порядке полей сортировки.
+
+        Цепочка OR дополняется нестрогой границей по первому полю:
+        без неё SQLite не видит диапазона в индексе и сортирует
+        всю ленту, как при OFFSET"""
+        condition = Q()
+        prefix = {}
+        bound = None
+        for ordering, value in zip(self.ordering, values):
+            field = ordering.lstrip("-")
+            descending = ordering.startswith("-")
+            lookup = "lt" if descending == forward else "gt"
+            if bound is None:
+                bound = Q(**{f"{field}__{lookup}e": value})
+            condition |= Q(**prefix, **{f"{field}__{lookup}": value})
+            prefix[field] = value
+        return bound & condition
+
+    def _fields(self):
+        return [ordering.lstrip("-") for ordering in self.ordering]
+
+    def _model_field(self, name):
+        """Поле модели или аннотации, по которому идёт сортировка"""
+        query = self.object_list.query
+        if name in query.annotations:
+            return query.annotations[name].output_field
+        opts = self.object_list.model._meta
+        *path, last = name.split("__")
+        for part in path:
+            opts = opts.get_field(part).related_model._meta
+        return opts.pk if last == "pk" else opts.get_field(last)
+
+    @staticmethod
+    def _value(obj, field):
+        for attr in field.split("__"):
+            obj = getattr(obj, attr)
+        return obj
+
+    @staticmethod
+    def _reverse(ordering):
+        if ordering.startswith("-"):
+            return ordering[1:]
+        return f"-{ordering}"
+
+
+def _neighbour(number, exists, step):
+    if number is None or not exists:
+        raise InvalidPage("Соседней страницы с номером нет")
+    return number + step
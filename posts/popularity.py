@@ -0,0 +1,108 @@
+"""Рейтинг постов для ленты популярного.
+
+Пост и каждый комментарий к нему дают вклад, который убывает как
+exp(-возраст / POPULAR_DECAY_HOURS). Вклад самого поста тем больше,
+чем больше у автора подписчиков. Сумма вкладов хранится как
+логарифм величины, отсчитанной от фиксированной эпохи: деление
+на exp(сейчас / τ) одинаково для всех постов и не меняет порядок,
+поэтому рейтинги не нужно пересчитывать с ходом времени,
+а новый комментарий просто прибавляет свой вклад."""
+import datetime as dt
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from yatube.settings import (POPULAR_DECAY_HOURS, POPULAR_FOLLOWER_WEIGHT,
+                             POPULAR_WINDOW_DAYS)
+
+from .models import AuthorStats, Comment, Post, PostScore
+
+EPOCH = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+DECAY = dt.timedelta(hours=POPULAR_DECAY_HOURS)
+BATCH_SIZE = 500
+
+
+def score(pub_date, followers, comment_dates=()):
+    """Логарифм суммы вкладов поста и его комментариев"""
+    weight = 1 + POPULAR_FOLLOWER_WEIGHT * math.log1p(followers)
+    terms = [_age(pub_date) + math.log(weight)]
+    terms.extend(_age(created) for created in comment_dates)
+    top = max(terms)
+    return top + math.log(sum(math.exp(term - top) for term in terms))
+
+
+def add_post(post):
+    PostScore.objects.update_or_create(
+        post_id=post.pk,
+        defaults={"score": score(post.pub_date,
+                                 _followers([post.author_id]).get(
+                                     post.author_id, 0))}
+    )
+
+
+def add_comment(comment):
+    """Прибавляет вклад нового комментария к рейтингу поста"""
+    contribution = _age(comment.created)
+    with transaction.atomic():
+        row = PostScore.objects.select_for_update().filter(
+            post_id=comment.post_id).first()
+        if row is None:
+            # Пост старше окна пересчёта снова обсуждают
+            for pub_date, author_id in Post.objects.filter(
+                    pk=comment.post_id).values_list("pub_date", "author_id"):
+                base = score(pub_date,
+                             _followers([author_id]).get(author_id, 0))
+                PostScore.objects.update_or_create(
+                    post_id=comment.post_id,
+                    defaults={"score": _add(base, contribution)})
+            return
+        row.score = _add(row.score, contribution)
+        row.save(update_fields=["score"])
+
+
+def recompute(now=None):
+    """Пересчитывает рейтинги постов, опубликованных или получивших
+    комментарии за последние POPULAR_WINDOW_DAYS дней; остальные
+    из таблицы удаляются. Возвращает число постов в рейтинге"""
+    since = (now or timezone.now()) - dt.timedelta(days=POPULAR_WINDOW_DAYS)
+    comment_dates = defaultdict(list)
+    recent_comments = Comment.objects.filter(created__gte=since)
+    for post_id, created in recent_comments.values_list(
+            "post_id", "created").iterator(chunk_size=BATCH_SIZE):
+        comment_dates[post_id].append(created)
+    posts = list(Post.objects.filter(
+        Q(pub_date__gte=since)
+        | Q(pk__in=recent_comments.values("post_id"))).values_list(
+            "id", "pub_date", "author_id"))
+    followers = _followers()
+    with transaction.atomic():
+        PostScore.objects.all().delete()
+        PostScore.objects.bulk_create(
+            (PostScore(post_id=post_id,
+                       score=score(pub_date, followers.get(author_id, 0),
+                                   comment_dates[post_id]))
+             for post_id, pub_date, author_id in posts),
+            batch_size=BATCH_SIZE
+        )
+    return len(posts)
+
+
+def _followers(author_ids=None):
+    """Число подписчиков авторов; без аргумента - всех авторов,
+    у которых подписчики есть"""
+    stats = AuthorStats.objects.filter(followers_count__gt=0)
+    if author_ids is not None:
+        stats = stats.filter(user_id__in=author_ids)
+    return dict(stats.values_list("user_id", "followers_count"))
+
+
+def _age(moment):
+    return (moment - EPOCH) / DECAY
+
+
+def _add(log_a, log_b):
+    top = max(log_a, log_b)
+    return top + math.log1p(math.exp(-abs(log_a - log_b)))
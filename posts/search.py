@@ -0,0 +1,139 @@
+"""Полнотекстовый поиск по постам.
+
+В индекс попадают основы слов текста (см. stemmer). На SQLite индекс -
+виртуальная таблица FTS5 с ранжированием bm25; на остальных базах -
+таблица SearchTerm, где каждая основа хранится с весом в посте,
+а ранг считается суммой весов с поправкой на редкость слова."""
+import math
+import re
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Sum, When
+
+from .models import Post, SearchTerm
+from .stemmer import stem
+
+FTS_TABLE = "posts_post_fts"
+MAX_TERMS = 10
+BATCH_SIZE = 500
+
+WORD = re.compile(r"\w+")
+
+_fts_tables = {}
+
+
+def terms(text):
+    return [stem(word)[:64] for word in WORD.findall(text)]
+
+
+def index_post(post):
+    """Заменяет записи поста в индексе"""
+    if _use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                           [post.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)",
+                [post.pk, " ".join(terms(post.text))])
+        return
+    SearchTerm.objects.filter(post_id=post.pk).delete()
+    SearchTerm.objects.bulk_create(_term_rows(post.pk, post.text))
+
+
+def remove_post(post_id):
+    """Строки SearchTerm удаляются каскадно вместе с постом"""
+    if _use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                           [post_id])
+
+
+def search_posts(query, offset, limit):
+    """Возвращает id постов, содержащих все слова запроса,
+    от самых релевантных к менее релевантным"""
+    query_terms = list(dict.fromkeys(terms(query)))[:MAX_TERMS]
+    if not query_terms:
+        return []
+    if _use_fts():
+        match = " ".join(f'"{term}"' for term in query_terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                "ORDER BY rank, rowid DESC LIMIT %s OFFSET %s",
+                [match, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+    return _search_terms(query_terms, offset, limit)
+
+
+def rebuild():
+    """Строит индекс заново по всем постам"""
+    if _use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    else:
+        SearchTerm.objects.all().delete()
+    total = 0
+    rows = Post.objects.order_by("pk").values_list("pk", "text")
+    batch = []
+    for pk, text in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append((pk, text))
+        if len(batch) == BATCH_SIZE:
+            total += _index_batch(batch)
+            batch = []
+    return total + _index_batch(batch)
+
+
+def _index_batch(batch):
+    if not batch:
+        return 0
+    if _use_fts():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)",
+                [(pk, " ".join(terms(text))) for pk, text in batch])
+    else:
+        SearchTerm.objects.bulk_create(
+            [row for pk, text in batch for row in _term_rows(pk, text)],
+            batch_size=BATCH_SIZE)
+    return len(batch)
+
+
+def _term_rows(post_id, text):
+    counts = Counter(terms(text))
+    length = math.sqrt(sum(counts.values()) or 1)
+    return [SearchTerm(term=term, post_id=post_id, weight=count / length)
+            for term, count in counts.items()]
+
+
+def _search_terms(query_terms, offset, limit):
+    # Число постов оценивается по наибольшему id: точный COUNT(*)
+    # на большой таблице дороже самого поиска
+    total = Post.objects.order_by("-pk").values_list(
+        "pk", flat=True).first() or 0
+    frequencies = dict(SearchTerm.objects.filter(
+        term__in=query_terms).values("term").annotate(
+            posts=Count("id")).values_list("term", "posts"))
+    if len(frequencies) < len(query_terms):
+        return []
+    score = Sum(Case(
+        *(When(term=term, then=F("weight") * math.log(
+            1 + total / frequencies[term])) for term in query_terms),
+        output_field=FloatField()
+    ))
+    return list(SearchTerm.objects.filter(
+        term__in=query_terms).values("post_id").annotate(
+            matched=Count("id"), score=score).filter(
+                matched=len(query_terms)).order_by(
+                    "-score", "-post_id").values_list(
+                        "post_id", flat=True)[offset:offset + limit])
+
+
+def _use_fts():
+    if connection.vendor != "sqlite":
+        return False
+    name = connection.settings_dict["NAME"]
+    if name not in _fts_tables:
+        _fts_tables[name] = (
+            FTS_TABLE in connection.introspection.table_names())
+    return _fts_tables[name]
@@ -0,0 +1,209 @@
+import datetime as dt
+import itertools
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from . import popularity, search, stats, timeline
+from .models import Comment, Follow, Group, Post
+from .transfer import bulk_insert
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+WORDS = ("котики", "погода", "новости", "путешествия", "книги", "кино",
+         "программирование", "музыка", "спорт", "еда")
+
+
+def seed(users, posts, follows, comments, groups=5, prefix="seed",
+         seed_value=None):
+    """Заполняет базу синтетическими данными через bulk_create
+    и пересчитывает денормализованные таблицы.
+
+    users - число пользователей, posts - общее число постов,
+    follows - подписок на пользователя, comments - комментариев на пост.
+    Возвращает список созданных пользователей."""
+    rnd = random.Random(seed_value)
+    with transaction.atomic():
+        User.objects.bulk_create(
+            [User(username=f"{prefix}_user_{i}", password="!")
+             for i in range(users)],
+            batch_size=BATCH_SIZE
+        )
+        user_ids = list(User.objects.filter(
+            username__startswith=f"{prefix}_user_").values_list(
+                "id", flat=True))
+        Group.objects.bulk_create(
+            [Group(title=f"Группа {i}", slug=f"{prefix}-group-{i}",
+                   description=f"Описание группы {i}")
+             for i in range(groups)],
+            batch_size=BATCH_SIZE
+        )
+        group_ids = list(Group.objects.filter(
+            slug__startswith=f"{prefix}-group-").values_list(
+                "id", flat=True)) + [None]
+        Post.objects.bulk_create(
+            [Post(text=f"Текст записи {i}",
+                  author_id=rnd.choice(user_ids),
+                  group_id=rnd.choice(group_ids))
+             for i in range(posts)],
+            batch_size=BATCH_SIZE
+        )
+        follow_pairs = set()
+        for user_id in user_ids:
+            others = [other for other in user_ids if other != user_id]
+            for author_id in rnd.sample(others, min(follows, len(others))):
+                follow_pairs.add((user_id, author_id))
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in follow_pairs],
+            batch_size=BATCH_SIZE
+        )
+        post_ids = Post.objects.filter(
+            author_id__in=user_ids).values_list("id", flat=True)
+        Comment.objects.bulk_create(
+            [Comment(post_id=post_id, author_id=rnd.choice(user_ids),
+                     text=f"Комментарий {i}")
+             for post_id in post_ids for i in range(comments)],
+            batch_size=BATCH_SIZE
+        )
+        refresh_denormalized()
+    return list(User.objects.filter(id__in=user_ids))
+
+
+def seed_load(users, posts, follows, comments, groups=20, days=365,
+              alpha=1.2, prefix="load", seed_value=None, progress=None):
+    """Заполняет базу данными с распределениями, похожими на живые.
+
+    Популярность и активность пользователей убывают по степенному закону
+    с показателем alpha: немногие авторы собирают большую часть
+    подписчиков, пишут большую часть постов и получают больше
+    комментариев. follows и comments - средние числа подписок
+    на пользователя и комментариев на пост. Посты равномерно во времени
+    распределены по последним days дням, комментарии появляются после
+    поста. Вставка идёт пачками, поэтому память не растёт с объёмом."""
+    rnd = random.Random(seed_value)
+    notify = progress or (lambda label, count: None)
+
+    User.objects.bulk_create(
+        (User(username=f"{prefix}_user_{i}", password="!")
+         for i in range(users)),
+        batch_size=BATCH_SIZE
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith=f"{prefix}_user_").order_by("id").values_list(
+            "id", flat=True))
+    notify("users", len(user_ids))
+    # Вес i-го пользователя ~ 1 / i^alpha; порядок случайный,
+    # чтобы популярность не совпадала с активностью
+    popularity = _power_law(user_ids, alpha, rnd)
+    activity = _power_law(user_ids, alpha, rnd)
+
+    Group.objects.bulk_create(
+        (Group(title=f"Группа {i}", slug=f"{prefix}-group-{i}",
+               description=f"Описание группы {i}")
+         for i in range(groups)),
+        batch_size=BATCH_SIZE
+    )
+    group_ids = list(Group.objects.filter(
+        slug__startswith=f"{prefix}-group-").values_list("id", flat=True))
+
+    follow_pairs = set()
+    for user_id in user_ids:
+        # Среднее распределения Парето равно alpha / (alpha - 1)
+        wanted = min(round(rnd.paretovariate(alpha) * follows
+                           * (alpha - 1) / alpha),
+                     len(user_ids) - 1)
+        authors = set()
+        # Популярных авторов выбирают повторно - добираем
+        # до нужного числа, но с ограничением попыток
+        for _ in range(wanted * 3):
+            if len(authors) >= wanted:
+                break
+            authors.add(rnd.choices(user_ids, cum_weights=popularity)[0])
+        authors.discard(user_id)
+        follow_pairs.update((user_id, author_id) for author_id in authors)
+    Follow.objects.bulk_create(
+        (Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in follow_pairs),
+        batch_size=BATCH_SIZE
+    )
+    notify("follows", len(follow_pairs))
+
+    start = timezone.now() - dt.timedelta(days=days)
+    step = dt.timedelta(days=days) / max(posts, 1)
+    first_post = (Post.objects.order_by("-id").values_list(
+        "id", flat=True).first() or 0)
+    created = 0
+    while created < posts:
+        size = min(BATCH_SIZE, posts - created)
+        with transaction.atomic():
+            bulk_insert(Post, (
+                Post(text=f"Запись {created + i} {rnd.choice(WORDS)}",
+                     author_id=rnd.choices(user_ids,
+                                           cum_weights=activity)[0],
+                     group_id=(rnd.choice(group_ids)
+                               if group_ids and rnd.random() < 0.5
+                               else None),
+                     pub_date=start + step * (created + i + rnd.random()))
+                for i in range(size)
+            ))
+        created += size
+        notify("posts", created)
+
+    mean_popularity = popularity[-1] / len(user_ids)
+    weights = dict(zip(user_ids, _weights(popularity)))
+    new_posts = Post.objects.filter(id__gt=first_post).order_by(
+        "id").values_list("id", "author_id", "pub_date")
+    now = timezone.now()
+    total = 0
+    rows = (
+        Comment(post_id=post_id,
+                author_id=rnd.choices(user_ids, cum_weights=activity)[0],
+                text=f"Комментарий {rnd.choice(WORDS)}",
+                created=pub_date + (now - pub_date) * rnd.random() ** 4)
+        for post_id, author_id, pub_date in new_posts.iterator(
+            chunk_size=BATCH_SIZE)
+        # Случайная добавка к дробной части сохраняет среднее
+        for _ in range(int(rnd.expovariate(
+            mean_popularity / (comments * weights[author_id]))
+            + rnd.random()) if comments else 0)
+    )
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        with transaction.atomic():
+            bulk_insert(Comment, batch)
+        total += len(batch)
+        notify("comments", total)
+
+    refresh_denormalized()
+    return user_ids
+
+
+def _power_law(user_ids, alpha, rnd):
+    """Накопленные веса 1 / rank^alpha для случайной
+    расстановки пользователей по рангам"""
+    ranks = list(range(1, len(user_ids) + 1))
+    rnd.shuffle(ranks)
+    return list(itertools.accumulate(1 / rank ** alpha for rank in ranks))
+
+
+def _weights(cumulative):
+    return [current - previous for previous, current
+            in zip([0] + cumulative[:-1], cumulative)]
+
+
+def refresh_denormalized():
+    """Приводит ленты, счётчики комментариев, статистику авторов,
+    поисковый индекс и рейтинги популярного в соответствие с данными
+    после массовой вставки мимо сигналов"""
+    timeline.rebuild()
+    stats.recount_comments()
+    stats.rebuild()
+    search.rebuild()
+    popularity.recompute()
@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import feed_cache, popularity, search, stats, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User
+from .storage import collect_orphan
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    for group_id, image in Post.objects.filter(pk=instance.pk).values_list(
+            "group_id", "image"):
+        if group_id is not None:
+            feed_cache.bump(feed_cache.group_scope(group_id))
+        if (image or "") != (instance.image.name or ""):
+            instance.image_variants = ""
+            _collect_after_commit(image)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    feed_cache.bump(*feed_cache.post_scopes(instance.group_id,
+                                            instance.author_id))
+    if instance.image and not instance.image_variants:
+        thumbnails.schedule(instance.pk)
+    search.index_post(instance)
+    if created:
+        timeline.fan_out_post(instance)
+        stats.increment(instance.author_id, "posts_count")
+        popularity.add_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    feed_cache.bump(*feed_cache.post_scopes(instance.group_id,
+                                            instance.author_id))
+    stats.decrement(instance.author_id, "posts_count")
+    search.remove_post(instance.pk)
+    _collect_after_commit(instance.image.name)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance)
+        stats.increment(instance.user_id, "following_count")
+        stats.increment(instance.author_id, "followers_count")
+        _bump_follow_pages(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.trim(instance)
+    stats.decrement(instance.user_id, "following_count")
+    stats.decrement(instance.author_id, "followers_count")
+    _bump_follow_pages(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.group_scope(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Вход на сайт обновляет только last_login, которого нет на страницах
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    feed_cache.bump(feed_cache.author_scope(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F("comment_count") + 1)
+        popularity.add_comment(instance)
+    _bump_post_feeds(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F("comment_count") - 1)
+    _bump_post_feeds(instance.post_id)
+
+
+def _bump_post_feeds(post_id):
+    for group_id, author_id in Post.objects.filter(
+            pk=post_id).values_list("group_id", "author_id"):
+        feed_cache.bump(*feed_cache.post_scopes(group_id, author_id))
+
+
+def _bump_follow_pages(follow):
+    """Счётчики подписок показываются на страницах обоих авторов"""
+    feed_cache.bump(feed_cache.author_scope(follow.user_id),
+                    feed_cache.author_scope(follow.author_id))
+
+
+def _collect_after_commit(image_name):
+    """Файл удаляется только после фиксации транзакции: при откате
+    пост по-прежнему ссылается на него"""
+    if image_name:
+        transaction.on_commit(lambda: collect_orphan(image_name))
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+
+def get_stats(user):
+    """Возвращает счётчики автора; для автора без записи
+    в таблице - нулевые"""
+    return (AuthorStats.objects.filter(user=user).first()
+            or AuthorStats(user=user))
+
+
+def increment(user_id, *fields):
+    AuthorStats.objects.get_or_create(user_id=user_id)
+    AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + 1 for field in fields})
+
+
+def decrement(user_id, *fields):
+    for field in fields:
+        AuthorStats.objects.filter(
+            user_id=user_id, **{f"{field}__gt": 0}).update(
+                **{field: F(field) - 1})
+
+
+def rebuild():
+    """Пересчитывает статистику всех авторов с нуля"""
+    posts = _counts(Post.objects, "author")
+    followers = _counts(Follow.objects, "author")
+    following = _counts(Follow.objects, "user")
+    with transaction.atomic():
+        AuthorStats.objects.all().delete()
+        batch = []
+        for user_id in User.objects.values_list("id", flat=True):
+            batch.append(AuthorStats(
+                user_id=user_id,
+                posts_count=posts.get(user_id, 0),
+                followers_count=followers.get(user_id, 0),
+                following_count=following.get(user_id, 0)
+            ))
+            if len(batch) >= BATCH_SIZE:
+                AuthorStats.objects.bulk_create(batch)
+                batch = []
+        AuthorStats.objects.bulk_create(batch)
+    return AuthorStats.objects.count()
+
+
+def recount_comments():
+    """Пересчитывает счётчики комментариев всех постов"""
+    counts = Comment.objects.filter(post=OuterRef("pk")).order_by().values(
+        "post").annotate(total=Count("id")).values("total")
+    Post.objects.update(comment_count=Coalesce(Subquery(counts), 0))
+
+
+def _counts(manager, field):
+    return dict(manager.order_by().values_list(field).annotate(
+        total=Count("id")))
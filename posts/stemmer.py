@@ -0,0 +1,63 @@
+"""Стеммер Портера для русского языка (алгоритм Snowball).
+
+Окончания ищутся в области RV - части слова после первой гласной.
+Слова без кириллицы возвращаются как есть."""
+import re
+
+RV = re.compile(r"^(.*?[аеиоуыэюя])(.*)$")
+PERFECTIVE_GERUND = re.compile(
+    r"((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$")
+REFLEXIVE = re.compile(r"(с[яь])$")
+ADJECTIVE = re.compile(
+    r"(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому"
+    r"|их|ых|ую|юю|ая|яя|ою|ею)$")
+PARTICIPLE = re.compile(r"((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$")
+VERB = re.compile(
+    r"((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло"
+    r"|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)"
+    r"|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$")
+NOUN = re.compile(
+    r"(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием"
+    r"|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$")
+DERIVATIONAL_R2 = re.compile(r".*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$")
+DERIVATIONAL = re.compile(r"ость?$")
+SUPERLATIVE = re.compile(r"(ейше|ейш)$")
+
+
+def stem(word):
+    word = word.lower().replace("ё", "е")
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+
+    # Шаг 1: деепричастие, иначе возвратная частица
+    # и одно из окончаний прилагательного, глагола или существительного
+    stripped = PERFECTIVE_GERUND.sub("", rv, 1)
+    if stripped == rv:
+        rv = REFLEXIVE.sub("", rv, 1)
+        stripped = ADJECTIVE.sub("", rv, 1)
+        if stripped != rv:
+            rv = PARTICIPLE.sub("", stripped, 1)
+        else:
+            stripped = VERB.sub("", rv, 1)
+            rv = NOUN.sub("", rv, 1) if stripped == rv else stripped
+    else:
+        rv = stripped
+
+    # Шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательный суффикс в области R2
+    if DERIVATIONAL_R2.match(rv):
+        rv = DERIVATIONAL.sub("", rv, 1)
+
+    # Шаг 4
+    if rv.endswith("ь"):
+        rv = rv[:-1]
+    else:
+        rv = SUPERLATIVE.sub("", rv, 1)
+        if rv.endswith("нн"):
+            rv = rv[:-1]
+    return start + rv
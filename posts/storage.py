@@ -0,0 +1,84 @@
+import hashlib
+import os
+import re
+import time
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from sorl.thumbnail import delete as delete_thumbnails
+
+from yatube.settings import IMAGE_ORPHAN_GRACE
+
+BLOB_NAME = re.compile(r"(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$")
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файл под SHA-256 его содержимого:
+    ``<каталог upload_to>/<2 символа хэша>/<хэш>.<расширение>``.
+    Одинаковые загрузки занимают на диске одно место,
+    а их миниатюры строятся один раз"""
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        digest = self.digest(content)
+        extension = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, digest[:2], digest + extension)
+        if self._touch(name):
+            return name
+        return super()._save(name, content)
+
+    def _touch(self, name):
+        """Обновляет время изменения существующего файла, чтобы
+        collect_orphan не удалил его до сохранения нового поста"""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    @staticmethod
+    def digest(content):
+        sha256 = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def is_blob(name):
+        return bool(name) and bool(BLOB_NAME.search(name))
+
+
+image_storage = ContentAddressedStorage()
+
+
+def collect_orphan(name):
+    """Удаляет файл и его миниатюры, если на него больше
+    не ссылается ни один пост. Файлы, сохранённые до перехода
+    на хранение по хэшу, не трогает.
+
+    Одинаковая загрузка могла получить этот файл после проверки
+    постов, но до удаления: файл сначала переименовывается, и если
+    его время изменения не старше начала проверки (с запасом
+    IMAGE_ORPHAN_GRACE секунд), возвращается на место"""
+    if not image_storage.is_blob(name):
+        return False
+    started = time.time()
+    Post = apps.get_model("posts", "Post")
+    if Post.objects.filter(image=name).exists():
+        return False
+    path = image_storage.path(name)
+    collecting = f"{path}.collecting"
+    try:
+        os.replace(path, collecting)
+    except FileNotFoundError:
+        return False
+    if os.stat(collecting).st_mtime > started - IMAGE_ORPHAN_GRACE:
+        os.replace(collecting, path)
+        return False
+    delete_thumbnails(name, delete_file=False)
+    os.remove(collecting)
+    return True
@@ -0,0 +1,96 @@
+from django import template
+from django.template.base import token_kwargs
+
+from posts.feed_cache import get_or_render
+from posts.models import Follow
+from posts.page_cache import hole_marker, is_skeleton
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, scopes, vary_on):
+        self.nodelist = nodelist
+        self.scopes = scopes
+        self.vary_on = vary_on
+
+    def render(self, context):
+        scopes = self.scopes.resolve(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        # Во фрагменте заготовки вместо частей пользователя стоят метки;
+        # иначе фрагмент может содержать их и хранится для каждого
+        # пользователя отдельно
+        request = context.get("request")
+        if request is not None and is_skeleton(request):
+            vary_on.append("skeleton")
+        else:
+            user = context.get("user")
+            vary_on.append(getattr(user, "pk", None))
+        return get_or_render(scopes, vary_on,
+                             lambda: self.nodelist.render(context))
+
+
+@register.tag
+def feedcache(parser, token):
+    """Кэширует фрагмент ленты до изменения версий областей::
+
+        {% feedcache feed_scopes page.position %}
+            ...
+        {% endfeedcache %}
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' принимает как минимум один аргумент")
+    nodelist = parser.parse(("endfeedcache",))
+    parser.delete_first_token()
+    return FeedCacheNode(nodelist,
+                         parser.compile_filter(bits[1]),
+                         [parser.compile_filter(bit) for bit in bits[2:]])
+
+
+class HoleNode(template.Node):
+    def __init__(self, template_name, kwargs):
+        self.template_name = template_name
+        self.kwargs = kwargs
+
+    def render(self, context):
+        template_name = self.template_name.resolve(context)
+        values = {name: value.resolve(context)
+                  for name, value in self.kwargs.items()}
+        request = context.get("request")
+        if request is not None and is_skeleton(request):
+            return hole_marker(template_name, values)
+        template = context.template.engine.get_template(template_name)
+        with context.push(**values):
+            return template.render(context)
+
+
+@register.tag
+def hole(parser, token):
+    """Часть страницы, зависящая от пользователя::
+
+        {% hole "post_edit_link.html" author=post.author.username %}
+
+    Обычно работает как include с переданными переменными. В заготовке
+    для кэша страниц (см. posts.page_cache) оставляет метку, и шаблон
+    отрисовывается для каждого запроса только с этими переменными,
+    user и request, поэтому значения должны сериализоваться в JSON"""
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' принимает имя шаблона")
+    remaining = bits[2:]
+    kwargs = token_kwargs(remaining, parser, support_legacy=False)
+    if remaining:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' принимает переменные в виде name=value")
+    return HoleNode(parser.compile_filter(bits[1]), kwargs)
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, author_id):
+    user = context.get("user")
+    if user is None or not user.is_authenticated:
+        return False
+    return Follow.objects.filter(user=user, author_id=author_id).exists()
@@ -1,5 +1,7 @@
 from django.urls import reverse
 
+from yatube.settings import PAGINATOR_NUMBER
+
 
 GROUP_SLUG = "test_group"
 GROUP_NAME = "test_group"
@@ -45,3 +47,13 @@ LOGIN_URL = reverse("users:login")
 FOLLOW_URL = reverse("posts:profile_follow", args=(AUTHOR_USERNAME,))
 UNFOLLOW_URL = reverse("posts:profile_unfollow", args=(AUTHOR_USERNAME,))
 FOLLOW_INDEX_URL = reverse("posts:follow_index")
+SEARCH_URL = reverse("posts:search")
+POPULAR_URL = reverse("posts:popular")
+
+PAGE_SIZE = PAGINATOR_NUMBER
+# Группа, страница ленты и число записей в группе, а также id группы
+# и дата её последнего поста для ETag и Last-Modified, id последнего
+# комментария для ETag
+GROUP_PAGE_QUERIES = 6
+API_INDEX_URL = reverse("api:index")
+API_FOLLOW_URL = reverse("api:follow_index")
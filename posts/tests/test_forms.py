@@ -1,13 +1,21 @@
+import os
 import shutil
 import tempfile
+import time
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.models import Comment, Group, Post
+from posts.storage import collect_orphan, image_storage
+from yatube.settings import IMAGE_ORPHAN_GRACE
 
 from . import constants as const
 
@@ -89,6 +97,108 @@ class PostCreateFormTests(TestCase):
         self.assertRedirects(response, redirection_page)
         self.assertNotEqual(initial_text, Post.objects.get(id=post_id).text)
 
+    def test_edit_keeps_concurrent_comment_count(self):
+        """Комментарий, добавленный во время редактирования поста,
+        не теряется в счётчике комментариев"""
+        post = PostCreateFormTests.test_post
+        commented = []
+
+        def comment_before_update(execute, sql, params, many, context):
+            if sql.startswith("UPDATE") and not commented:
+                commented.append(sql)
+                Comment.objects.create(post=post, text="Комментарий",
+                                       author=PostCreateFormTests.test_user)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(comment_before_update):
+            self.authorized_client.post(PostCreateFormTests.POST_EDIT_URL,
+                                        data={"text": "Новый текст"})
+        self.assertTrue(commented)
+        self.assertEqual(Post.objects.get(id=post.id).comment_count,
+                         post.comments.count())
+
+    def test_large_image_is_downsized_without_exif(self):
+        """Картинка больше MAX_IMAGE_DIMENSION уменьшается
+        при загрузке, а EXIF из неё удаляется"""
+        exif = Image.Exif()
+        exif[0x010F] = "Camera"
+        buffer = BytesIO()
+        Image.new("RGB", (4000, 100)).save(buffer, "JPEG", exif=exif)
+        uploaded = SimpleUploadedFile(name="big.jpg",
+                                      content=buffer.getvalue(),
+                                      content_type="image/jpeg")
+        self.authorized_client.post(
+            const.NEW_POST_URL,
+            data={"text": "Большая картинка", "image": uploaded})
+        post = Post.objects.get(text="Большая картинка")
+        with Image.open(post.image.path) as saved:
+            self.assertEqual(max(saved.size), settings.MAX_IMAGE_DIMENSION)
+            self.assertFalse(saved.getexif())
+
+    @override_settings(MAX_IMAGE_UPLOAD_SIZE=16)
+    def test_oversized_upload_is_rejected(self):
+        """Файл больше MAX_IMAGE_UPLOAD_SIZE не сохраняется,
+        а форма возвращает ошибку"""
+        post_count = Post.objects.count()
+        uploaded = SimpleUploadedFile(
+            name="small.gif",
+            content=const.SMALL_GIF,
+            content_type="image/gif"
+        )
+        response = self.authorized_client.post(
+            const.NEW_POST_URL,
+            data={"text": "Слишком большой файл", "image": uploaded})
+        self.assertEqual(Post.objects.count(), post_count)
+        self.assertIn("image", response.context["form"].errors)
+
+    def test_identical_uploads_share_one_file(self):
+        """Одинаковые картинки хранятся одним файлом,
+        который удаляется вместе с последним ссылающимся постом"""
+        for text in ("Первая копия", "Вторая копия"):
+            uploaded = SimpleUploadedFile(name=f"{text}.gif",
+                                          content=const.SMALL_GIF,
+                                          content_type="image/gif")
+            self.authorized_client.post(
+                const.NEW_POST_URL, data={"text": text, "image": uploaded})
+        first, second = Post.objects.filter(text__endswith="копия")
+        self.assertEqual(first.image.name, second.image.name)
+        name = first.image.name
+        self.age(name)
+        first.delete()
+        self.assertFalse(collect_orphan(name))
+        self.assertTrue(image_storage.exists(name))
+        second.delete()
+        self.assertTrue(collect_orphan(name))
+        self.assertFalse(image_storage.exists(name))
+
+    def test_upload_during_collection_keeps_file(self):
+        """Одинаковая загрузка между проверкой постов и удалением
+        файла не остаётся без картинки"""
+        uploaded = SimpleUploadedFile(name="small.gif",
+                                      content=const.SMALL_GIF,
+                                      content_type="image/gif")
+        post = Post.objects.create(text=const.POST_TEXT, image=uploaded,
+                                   author=PostCreateFormTests.test_user)
+        name = post.image.name
+        self.age(name)
+        post.delete()
+
+        def upload_after_check(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            self.assertEqual(image_storage.save(
+                "posts/copy.gif", ContentFile(const.SMALL_GIF)), name)
+            return result
+
+        with connection.execute_wrapper(upload_after_check):
+            self.assertFalse(collect_orphan(name))
+        self.assertTrue(image_storage.exists(name))
+
+    @staticmethod
+    def age(name):
+        """Делает файл старше запаса времени collect_orphan"""
+        old = time.time() - IMAGE_ORPHAN_GRACE - 60
+        os.utime(image_storage.path(name), (old, old))
+
 
 class CommentCreateTests(TestCase):
     @classmethod
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.db import DatabaseCache
+from django.db import router
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import resolve
+
+from posts.models import Post
+from yatube.middleware import ReplicaRoutingMiddleware
+
+from . import constants as const
+
+User = get_user_model()
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_user = User.objects.create_user(username=const.USERNAME)
+        cls.test_post = Post.objects.create(
+            text=const.POST_TEXT,
+            author=RequestMetricsMiddlewareTests.test_user
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    def test_sampled_request_has_server_timing(self):
+        """Замеренный запрос получает заголовок Server-Timing
+        и пишет строку в лог"""
+        with self.assertLogs("yatube.metrics", level="INFO") as logs:
+            response = self.client.get(const.PROFILE_URL)
+        server_timing = response["Server-Timing"]
+        for metric in ("total;dur=", "tpl;dur=", "db;dur=", "dup;desc="):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, server_timing)
+        self.assertIn('"view": "posts:profile"', logs.output[0])
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_not_sampled_request_is_untouched(self):
+        response = self.client.get(const.PROFILE_URL)
+        self.assertFalse(response.has_header("Server-Timing"))
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def route(self, request, written=Post):
+        """Возвращает базу, из которой представление читало бы посты,
+        и ответ middleware; POST-запрос пишет модель written"""
+        reads = []
+
+        def view(request):
+            middleware.process_view(request, view, (), {})
+            reads.append(router.db_for_read(Post))
+            if request.method == "POST":
+                router.db_for_write(written)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        request.resolver_match = resolve(request.path)
+        response = middleware(request)
+        return reads[0], response
+
+    def test_feed_reads_go_to_replica(self):
+        database, response = self.route(self.factory.get(const.HOME_URL))
+        self.assertEqual(database, "replica")
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_write_pins_client_to_primary(self):
+        """После записи клиент получает cookie и, пока она есть,
+        читает из основной базы"""
+        database, response = self.route(self.factory.post(
+            const.NEW_POST_URL))
+        self.assertEqual(database, "default")
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        request = self.factory.get(const.HOME_URL)
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = "1"
+        database, response = self.route(request)
+        self.assertEqual(database, "default")
+
+    def test_cache_write_does_not_pin_client(self):
+        """Заполнение кэша в таблице базы не закрепляет клиента
+        за основной базой"""
+        cache_model = DatabaseCache("yatube_cache", {}).cache_model_class
+        database, response = self.route(
+            self.factory.post(const.NEW_POST_URL), written=cache_model)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_other_views_read_from_primary(self):
+        database, response = self.route(self.factory.get(const.NEW_POST_URL))
+        self.assertEqual(database, "default")
@@ -1,7 +1,17 @@
+import datetime as dt
+from io import StringIO
+from unittest import skipUnless
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
 
-from posts.models import Group, Post
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.paginator import CursorPaginator
+from posts.seeding import seed_load
+from posts.transfer import export_records, import_records
 
 from . import constants as const
 
@@ -58,3 +68,161 @@ class GroupModelTest(TestCase):
         group = GroupModelTest.group
         expected_object_name = group.title
         self.assertEqual(str(group), expected_object_name)
+
+
+@skipUnless(connection.vendor == "sqlite",
+            "Проверяется план запросов SQLite")
+class QueryPlanTests(TestCase):
+    """Запросы лент и подписок используют составные индексы"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=const.AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=const.USERNAME)
+        cls.group = Group.objects.create(
+            title=const.GROUP_TITLE,
+            slug=const.GROUP_SLUG,
+            description=const.GROUP_DESCRIPTION
+        )
+        cls.post = Post.objects.create(author=cls.author,
+                                       text=const.POST_TEXT,
+                                       group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.user,
+                               text="Комментарий")
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_feed_pages_use_indexes(self):
+        """Первая страница и страница после курсора в том виде,
+        в каком их строит CursorPaginator, идут по индексу без
+        досортировки"""
+        feed_ordering = ("-pub_date", "-id")
+        feeds = {
+            "post_pub_date_id_idx": (Post.objects.all(), feed_ordering),
+            "post_group_pub_date_id_idx": (
+                Post.objects.filter(group=QueryPlanTests.group),
+                feed_ordering),
+            "post_author_pub_date_id_idx": (
+                Post.objects.filter(author=QueryPlanTests.author),
+                feed_ordering),
+            "comment_post_created_idx": (
+                Comment.objects.filter(post=QueryPlanTests.post),
+                ("-created", "id")),
+            "timeline_user_date_post_idx": (
+                timeline.feed(QueryPlanTests.user), timeline.FEED_ORDERING),
+        }
+        # Столбцы, на которые ссылаются аннотации сортировки
+        columns = {"feed_date": "pub_date"}
+        for index_name, (queryset, ordering) in feeds.items():
+            paginator = CursorPaginator(queryset, 10, ordering=ordering)
+            cursor = paginator.decode_cursor(paginator.encode_cursor(
+                paginator.object_list.first()))
+            pages = {
+                "first": paginator.object_list[:11],
+                "after": paginator.object_list.filter(
+                    paginator._seek(cursor, forward=True))[:11],
+                "before": paginator.object_list.filter(
+                    paginator._seek(cursor, forward=False)).reverse()[:11],
+            }
+            field = ordering[0].lstrip("-")
+            field = columns.get(field, field)
+            for page, page_queryset in pages.items():
+                with self.subTest(index=index_name, page=page):
+                    self.assertUsesIndex(page_queryset, index_name)
+                    if page != "first":
+                        # Курсор сужает диапазон индекса, а не фильтрует
+                        # все строки ленты
+                        self.assertRegex(page_queryset.explain(),
+                                         rf"\b{field}[<>]=?\?")
+
+    def test_follow_lookup_uses_unique_index(self):
+        plan = Follow.objects.filter(author=QueryPlanTests.author,
+                                     user=QueryPlanTests.user).explain()
+        self.assertIn("user_id_author_id", plan)
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username=const.AUTHOR_USERNAME)
+        reader = User.objects.create_user(username=const.USERNAME)
+        group = Group.objects.create(title=const.GROUP_TITLE,
+                                     slug=const.GROUP_SLUG)
+        post = Post.objects.create(text=const.POST_TEXT, author=author,
+                                   group=group)
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc))
+        Comment.objects.create(post=post, author=reader, text="Комментарий")
+        Follow.objects.create(user=reader, author=author)
+
+    def test_export_import_round_trip(self):
+        """Выгрузка загружается в пустую базу с теми же id и датами,
+        а повторная загрузка ничего не дублирует"""
+        stream = StringIO()
+        export_records(stream, batch_size=1)
+        expected = list(Post.objects.values_list("id", "pub_date",
+                                                 "author__username"))
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        lines = stream.getvalue().splitlines()
+        for _ in range(2):
+            totals = import_records(lines, batch_size=1)
+        self.assertEqual(totals, {"user": 2, "group": 1, "post": 1,
+                                  "comment": 1, "follow": 1})
+        self.assertEqual(list(Post.objects.values_list(
+            "id", "pub_date", "author__username")), expected)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_import_keeps_auto_dates_of_other_saves(self):
+        """Пока загрузка вставляет посты с датами из выгрузки,
+        обычное сохранение поста получает текущую дату"""
+        stream = StringIO()
+        export_records(stream)
+        Post.objects.all().delete()
+        author = User.objects.get(username=const.AUTHOR_USERNAME)
+        saved = []
+
+        def save_during_insert(execute, sql, params, many, context):
+            if 'INTO "posts_post"' in sql and not saved:
+                saved.append(Post(text=const.POST_TEXT, author=author))
+                saved[0].save()
+            return execute(sql, params, many, context)
+
+        started = timezone.now()
+        with connection.execute_wrapper(save_during_insert):
+            import_records(stream.getvalue().splitlines())
+        self.assertGreaterEqual(saved[0].pub_date, started)
+        self.assertEqual(Post.objects.order_by("pub_date").first().pub_date,
+                         dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc))
+
+    def test_import_resumes_after_checkpoint(self):
+        """Строки до контрольной точки при продолжении пропускаются"""
+        stream = StringIO()
+        export_records(stream)
+        lines = stream.getvalue().splitlines()
+        checkpoints = []
+        totals = import_records(
+            lines, skip=4, progress=lambda *args: checkpoints.append(args))
+        self.assertEqual(totals, {"comment": 1, "follow": 1})
+        self.assertEqual(checkpoints, [("comment", 1, 5), ("follow", 1, 6)])
+
+
+class SeedLoadTests(TestCase):
+    def test_seed_load_spreads_posts_and_fills_timelines(self):
+        """seed_load растягивает даты постов на заданный период,
+        а ленты подписчиков собираются по всем постам авторов"""
+        seed_load(users=30, posts=200, follows=5, comments=2, days=30,
+                  seed_value=1)
+        self.assertEqual(Post.objects.count(), 200)
+        oldest = Post.objects.order_by("pub_date").first().pub_date
+        newest = Post.objects.order_by("-pub_date").first().pub_date
+        self.assertGreater(newest - oldest, dt.timedelta(days=29))
+        expected = sum(Post.objects.filter(author_id=author_id).count()
+                       for author_id in Follow.objects.values_list(
+                           "author_id", flat=True))
+        self.assertEqual(TimelineEntry.objects.count(), expected)
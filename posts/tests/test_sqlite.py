@@ -0,0 +1,40 @@
+import os
+import tempfile
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.utils import load_backend
+from django.test import TestCase
+
+
+@skipUnless(connection.vendor == "sqlite", "Бэкенд yatube.sqlite")
+class TunedSqliteBackendTests(TestCase):
+    def test_pragmas_and_immediate_transactions(self):
+        """Новое соединение получает PRAGMAS из настроек,
+        а atomic начинается с BEGIN IMMEDIATE"""
+        backend = load_backend("yatube.sqlite")
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = dict(connection.settings_dict,
+                                 NAME=os.path.join(directory, "db.sqlite3"),
+                                 PRAGMAS={"journal_mode": "WAL",
+                                          "busy_timeout": 5000},
+                                 TRANSACTION_MODE="IMMEDIATE")
+            tuned = backend.DatabaseWrapper(settings_dict, alias="tuned")
+            try:
+                with tuned.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], "wal")
+                    cursor.execute("PRAGMA busy_timeout")
+                    self.assertEqual(cursor.fetchone()[0], 5000)
+                with tuned.execute_wrapper(self.record):
+                    self.statements = []
+                    tuned.set_autocommit(True)
+                    tuned._start_transaction_under_autocommit()
+                    tuned.cursor().execute("ROLLBACK")
+                self.assertEqual(self.statements[0], "BEGIN IMMEDIATE")
+            finally:
+                tuned.close()
+
+    def record(self, execute, sql, params, many, context):
+        self.statements.append(sql)
+        return execute(sql, params, many, context)
@@ -0,0 +1,51 @@
+import os
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+from django.test import SimpleTestCase
+
+from yatube.settings import env_flag
+from yatube.template_cache import precompile, template_names
+
+
+class TemplatePrecompileTests(SimpleTestCase):
+    def test_precompile_fills_cached_loader(self):
+        """Все шаблоны проекта разбираются заранее и доступны кэширующему
+        загрузчику под теми же именами, что и в {% include %}"""
+        params = settings.TEMPLATES[0]
+        backend = DjangoTemplates({
+            "NAME": "precompiled",
+            "DIRS": params["DIRS"],
+            "APP_DIRS": False,
+            "OPTIONS": {**params["OPTIONS"], "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ]},
+        })
+        names = template_names(backend.engine)
+        for name in ("index.html", "posts/index.html", "post_item.html",
+                     "registration/login.html"):
+            with self.subTest(name=name):
+                self.assertIn(name, names)
+        self.assertEqual(precompile(backend.engine), len(names))
+        loader = backend.engine.template_loaders[0]
+        self.assertTrue(all(name in loader.get_template_cache
+                            for name in names))
+
+    def test_env_flag_parses_values(self):
+        """TEMPLATE_CACHE=0 и DEBUG=False выключают флаг,
+        а не включают его как непустая строка"""
+        name = "YATUBE_TEST_FLAG"
+        values = {"1": True, "true": True, "Yes": True,
+                  "0": False, "False": False, "": False}
+        try:
+            for value, expected in values.items():
+                with self.subTest(value=value):
+                    os.environ[name] = value
+                    self.assertIs(env_flag(name, default=True), expected)
+            del os.environ[name]
+            self.assertIs(env_flag(name, default=True), True)
+        finally:
+            os.environ.pop(name, None)
@@ -1,15 +1,29 @@
+import base64
+import datetime as dt
 import shutil
 import tempfile
+from io import StringIO
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from posts.models import Follow, Group, Post
+from posts import feed_cache, popularity
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          PostScore, SearchTerm, TimelineEntry)
+from posts.paginator import CursorPaginator
+from posts.search import _search_terms, _term_rows, search_posts
+from posts.thumbnails import generate
 
 from . import constants as const
 
@@ -138,6 +152,24 @@ class PostPagesTests(TestCase):
         self.assertEqual(form_group, PostPagesTests.test_post.group)
         self.assertEqual(form_image, PostPagesTests.test_post.image)
 
+    def test_image_variants_placeholder_until_built(self):
+        """Пока варианты картинки не построены, вместо неё выводится
+        заглушка; после построения - srcset с WebP и JPEG"""
+        Post.objects.filter(id=PostPagesTests.test_post.id).update(
+            image_variants="")
+        response = self.authorized_client.get(PostPagesTests.POST_URL)
+        self.assertContains(response, "Миниатюра ещё строится")
+        variants = generate(PostPagesTests.test_post.id)
+        self.assertEqual(set(variants), {"webp", "jpeg"})
+        post = Post.objects.get(id=PostPagesTests.test_post.id)
+        self.assertEqual(post.variants, {
+            key: [list(variant) for variant in value]
+            for key, value in variants.items()
+        })
+        response = self.authorized_client.get(PostPagesTests.POST_URL)
+        self.assertContains(response, post.webp_srcset)
+        self.assertContains(response, post.jpeg_srcset)
+
     def test_post_at_home_page(self):
         """Тестовый пост появляется на главной странице"""
         response = self.authorized_client.get(const.HOME_URL)
@@ -179,6 +211,7 @@ class PaginatorViewTests(TestCase):
         Post.objects.bulk_create(new_posts)
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.pages = [
             const.HOME_URL,
@@ -195,6 +228,66 @@ class PaginatorViewTests(TestCase):
                 self.assertEqual(len(first_page_posts), 10)
                 self.assertEqual(len(second_page_posts), 1)
 
+    def test_cursor_links_walk_through_pages(self):
+        """Курсоры ?after= и ?before= ведут на соседние страницы"""
+        for page in self.pages:
+            with self.subTest():
+                first_page = self.client.get(page).context["page"]
+                self.assertIsNone(first_page.previous_cursor)
+                second_page = self.client.get(
+                    page + "?after=" + first_page.next_cursor
+                ).context["page"]
+                self.assertEqual(len(second_page), 1)
+                self.assertIsNone(second_page.next_cursor)
+                self.assertNotIn(second_page[0], list(first_page))
+                back_page = self.client.get(
+                    page + "?before=" + second_page.previous_cursor
+                ).context["page"]
+                self.assertEqual(list(back_page), list(first_page))
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        """Токен с неверными типами значений ведёт на первую страницу"""
+        token = base64.urlsafe_b64encode(b'["x", 1]').decode()
+        for page in self.pages:
+            with self.subTest(page=page):
+                response = self.client.get(page, {"after": token})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context["page"]),
+                                 const.PAGE_SIZE)
+
+    def test_huge_page_number_does_not_break_feed(self):
+        """Номер страницы, переполняющий OFFSET, не ломает ленту"""
+        for page in (*self.pages, const.API_INDEX_URL):
+            with self.subTest(page=page):
+                response = self.client.get(page, {"page": "9" * 20})
+                self.assertEqual(response.status_code, 200)
+
+    def test_pages_do_not_count_rows(self):
+        """Страница ленты собирается без запроса COUNT(*)"""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        with CaptureQueriesContext(connection) as queries:
+            page = paginator.paginate({"page": "2"})
+        self.assertEqual(len(page), 1)
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertFalse(any("COUNT(" in query["sql"]
+                             for query in queries.captured_queries))
+
+    def test_page_api_uses_fetched_neighbours(self):
+        """Методы страницы отвечают по уже выбранным записям,
+        без запросов к базе, и для страниц по курсору тоже"""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.paginate({"page": "1"})
+        after = paginator.paginate({"after": first.next_cursor})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual((first.has_previous(), first.has_next(),
+                              first.start_index(), first.end_index(),
+                              first.next_page_number()),
+                             (False, True, 1, 10, 2))
+            self.assertEqual((after.has_previous(), after.has_next(),
+                              after.has_other_pages(), after.start_index()),
+                             (True, False, True, None))
+        self.assertEqual(len(queries.captured_queries), 0)
+
 
 class ErrorCodesReturn(TestCase):
     def setUp(self):
@@ -217,23 +310,70 @@ class CacheUseTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
 
     def test_home_page_uses_cache(self):
-        """Контент не меняется до очистки кэша"""
-        response_before_creating_post = self.client.get(const.HOME_URL)
-        Post.objects.create(
-            text=const.POST_TEXT,
-            author=User.objects.get(username=const.USERNAME)
-        )
-        response_after_creating_post = self.client.get(const.HOME_URL)
+        """Контент, изменённый в обход сигналов,
+        не меняется до очистки кэша"""
+        response_before_update = self.client.get(const.HOME_URL)
+        Post.objects.filter(pk=CacheUseTests.test_post.pk).update(
+            text="Изменённый текст")
+        response_after_update = self.client.get(const.HOME_URL)
         cache.clear()
         response_after_cache_clearing = self.client.get(const.HOME_URL)
-        self.assertEqual(response_before_creating_post.content,
-                         response_after_creating_post.content)
-        self.assertNotEqual(response_after_creating_post.content,
+        self.assertEqual(response_before_update.content,
+                         response_after_update.content)
+        self.assertNotEqual(response_after_update.content,
                             response_after_cache_clearing.content)
 
+    def test_new_post_invalidates_cache(self):
+        """Новый пост сразу появляется на закэшированных страницах"""
+        for url in (const.HOME_URL, const.PROFILE_URL):
+            with self.subTest(url=url):
+                self.client.get(url)
+                new_post = Post.objects.create(
+                    text=f"Новый пост для {url}",
+                    author=CacheUseTests.test_user
+                )
+                response = self.client.get(url)
+                self.assertContains(response, new_post.text)
+
+    def test_warm_cache_prerenders_index(self):
+        """Команда warm_cache заранее кладёт первую страницу
+        главной в кэш"""
+        call_command("warm_cache", stdout=StringIO())
+        html = feed_cache.get_or_render(
+            [feed_cache.ALL_POSTS], ("page", "anonymous", const.HOME_URL),
+            lambda: "не прогрето")
+        self.assertIn(const.POST_TEXT, html)
+
+    def test_fragment_is_cached_per_user(self):
+        """Фрагмент, отрисованный для одного пользователя,
+        не достаётся другому"""
+        fragment = Template("{% load feeds %}{% feedcache scopes %}"
+                            "{{ user.username }}{% endfeedcache %}")
+        other = User.objects.create_user(username=const.AUTHOR_USERNAME)
+        for user in (CacheUseTests.test_user, other, AnonymousUser()):
+            with self.subTest(user=user):
+                html = fragment.render(Context({
+                    "scopes": [feed_cache.ALL_POSTS], "user": user}))
+                self.assertEqual(html, user.username)
+
+    def test_stale_fragment_served_while_recomputing(self):
+        """Пока другой запрос пересчитывает фрагмент,
+        отдаётся устаревшая копия"""
+        scopes = [feed_cache.ALL_POSTS]
+        feed_cache.get_or_render(scopes, [], lambda: "старый")
+        feed_cache.bump(*scopes)
+        key = feed_cache._fragment_key(scopes, [])
+        cache.add(f"{key}:lock", 1)
+        self.assertEqual(
+            feed_cache.get_or_render(scopes, [], lambda: "новый"), "старый")
+        cache.delete(f"{key}:lock")
+        self.assertEqual(
+            feed_cache.get_or_render(scopes, [], lambda: "новый"), "новый")
+
 
 class UsersFollowingTest(TestCase):
     @classmethod
@@ -261,6 +401,13 @@ class UsersFollowingTest(TestCase):
             author=UsersFollowingTest.author)
         self.assertTrue(follow.exists())
 
+    def test_unfollow_without_follow_redirects(self):
+        """Отписка от автора, на которого пользователь
+        не подписан, не приводит к ошибке"""
+        response = self.user_client.get(const.UNFOLLOW_URL)
+        self.assertRedirects(response, reverse(
+            "posts:profile", args=(const.AUTHOR_USERNAME,)))
+
     def test_new_post_appears_for_followers(self):
         """При подписке пользователя на другого пользователя новый
         пост отображается в ленте подписанных пользователей
@@ -271,3 +418,409 @@ class UsersFollowingTest(TestCase):
         self.user_client.get(const.UNFOLLOW_URL)
         response = self.user_client.get(const.FOLLOW_INDEX_URL)
         self.assertEqual(len(response.context["page"]), 0)
+
+    def test_new_post_fans_out_to_timelines(self):
+        """Новый пост автора попадает в материализованную
+        ленту каждого подписчика"""
+        self.user_client.get(const.FOLLOW_URL)
+        new_post = Post.objects.create(
+            text=const.POST_TEXT,
+            author=UsersFollowingTest.author
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=UsersFollowingTest.test_user, post=new_post).exists())
+        response = self.user_client.get(const.FOLLOW_INDEX_URL)
+        self.assertEqual(response.context["page"][0], new_post)
+        self.user_client.get(const.UNFOLLOW_URL)
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=UsersFollowingTest.test_user).exists())
+
+    def test_author_stats_follow_changes(self):
+        """Счётчики подписок и записей обновляются при подписке,
+        отписке и публикации, а команда пересчёта даёт те же значения"""
+        self.user_client.get(const.FOLLOW_URL)
+        author_stats = AuthorStats.objects.get(user=UsersFollowingTest.author)
+        user_stats = AuthorStats.objects.get(user=UsersFollowingTest.test_user)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(user_stats.following_count, 1)
+        response = self.user_client.get(reverse(
+            "posts:profile", args=(const.AUTHOR_USERNAME,)))
+        self.assertEqual(response.context["stats"], author_stats)
+        self.user_client.get(const.UNFOLLOW_URL)
+        author_stats.refresh_from_db()
+        self.assertEqual(author_stats.followers_count, 0)
+        AuthorStats.objects.update(posts_count=100)
+        call_command("rebuild_author_stats", stdout=StringIO())
+        author_stats.refresh_from_db()
+        self.assertEqual(author_stats.posts_count, 1)
+
+
+class CommentCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=const.AUTHOR_USERNAME)
+        cls.test_group = Group.objects.create(
+            title=const.GROUP_TITLE,
+            slug=const.GROUP_SLUG,
+            description=const.GROUP_DESCRIPTION
+        )
+        for i in range(const.PAGE_SIZE):
+            post = Post.objects.create(
+                text=f"Текст записи {i}",
+                author=CommentCountTests.author,
+                group=CommentCountTests.test_group
+            )
+            Comment.objects.create(post=post,
+                                   author=CommentCountTests.author,
+                                   text="Комментарий")
+        cls.test_post = post
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_comment_count_follows_comments(self):
+        """Счётчик комментариев поста меняется при добавлении
+        и удалении комментария"""
+        post = CommentCountTests.test_post
+        comment = Comment.objects.create(post=post,
+                                         author=CommentCountTests.author,
+                                         text="Ещё комментарий")
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 2)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
+    def test_feed_page_query_count_is_fixed(self):
+        """Число запросов страницы ленты не зависит
+        от количества постов на ней"""
+        with self.assertNumQueries(const.GROUP_PAGE_QUERIES):
+            response = self.client.get(const.GROUP_URL)
+        self.assertContains(response, "Комментариев: 1",
+                            count=const.PAGE_SIZE)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username=const.USERNAME)
+        cls.often = Post.objects.create(
+            text="Котики, котики и ещё раз котики", author=author)
+        cls.once = Post.objects.create(
+            text="Сегодня видел котика у подъезда", author=author)
+        cls.other = Post.objects.create(
+            text="Программирование на Python", author=author)
+
+    def test_search_finds_word_forms_by_rank(self):
+        """Поиск находит другие формы слова, а пост с большим числом
+        совпадений показывается первым"""
+        response = Client().get(const.SEARCH_URL, {"q": "котиков"})
+        self.assertEqual(response.context["posts"],
+                         [SearchTests.often, SearchTests.once])
+
+    def test_huge_page_number_finds_nothing(self):
+        """Номер страницы, переполняющий OFFSET, не ломает поиск"""
+        response = Client().get(const.SEARCH_URL,
+                                {"q": "котиков", "page": "9" * 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["posts"], [])
+
+    def test_search_index_follows_edits(self):
+        """Изменённый текст поста сразу ищется по новым словам"""
+        post = SearchTests.other
+        post.text = "Программирование котиков"
+        post.save()
+        self.assertIn(post.pk, search_posts("котик", 0, 10))
+        post.delete()
+        self.assertNotIn(post.pk, search_posts("котик", 0, 10))
+
+    def test_term_table_fallback(self):
+        """Индекс в таблице SearchTerm ранжирует так же, как FTS5"""
+        for post in Post.objects.all():
+            SearchTerm.objects.bulk_create(_term_rows(post.pk, post.text))
+        self.assertEqual(_search_terms(["котик"], 0, 10),
+                         [SearchTests.often.pk, SearchTests.once.pk])
+        self.assertEqual(_search_terms(["котик", "подъезд"], 0, 10),
+                         [SearchTests.once.pk])
+
+
+class PopularTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=const.AUTHOR_USERNAME)
+        cls.reader = User.objects.create_user(username=const.USERNAME)
+        cls.discussed = Post.objects.create(text="Обсуждаемый пост",
+                                            author=cls.author)
+        Post.objects.filter(pk=cls.discussed.pk).update(
+            pub_date=timezone.now() - dt.timedelta(days=2))
+        cls.fresh = Post.objects.create(text="Свежий пост",
+                                        author=cls.reader)
+        popularity.recompute()
+
+    def test_discussed_post_outranks_fresh_one(self):
+        """Свежие комментарии поднимают старый пост выше нового
+        поста без обсуждения, а инкрементальный рейтинг совпадает
+        с полным пересчётом"""
+        for _ in range(5):
+            Comment.objects.create(post=PopularTests.discussed,
+                                   author=PopularTests.reader,
+                                   text="Комментарий")
+        response = Client().get(const.POPULAR_URL)
+        self.assertEqual(list(response.context["page"]),
+                         [PopularTests.discussed, PopularTests.fresh])
+        incremental = dict(PostScore.objects.values_list("post", "score"))
+        self.assertEqual(popularity.recompute(), 2)
+        for post_id, score in PostScore.objects.values_list("post", "score"):
+            with self.subTest(post=post_id):
+                self.assertAlmostEqual(score, incremental[post_id])
+
+    def test_popular_link_shown_once(self):
+        """Ссылка на популярное есть только в шапке,
+        без повтора во вкладках лент"""
+        client = Client()
+        client.force_login(PopularTests.reader)
+        for url in (const.HOME_URL, const.FOLLOW_INDEX_URL):
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertContains(client.get(url),
+                                    f'href="{const.POPULAR_URL}"', count=1)
+
+    def test_followers_raise_post_score(self):
+        self.assertGreater(
+            popularity.score(timezone.now(), followers=100),
+            popularity.score(timezone.now(), followers=0))
+
+
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=const.AUTHOR_USERNAME)
+        cls.post = Post.objects.create(text=const.POST_TEXT,
+                                       author=cls.author)
+        for number in range(settings.COMMENTS_PER_PAGE + 5):
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f"Комментарий {number}")
+        cls.POST_URL = reverse("posts:post",
+                               args=(const.AUTHOR_USERNAME, cls.post.id))
+        cls.COMMENTS_URL = reverse("posts:post_comments",
+                                   args=(const.AUTHOR_USERNAME, cls.post.id))
+
+    def test_post_page_shows_first_comments_page(self):
+        """Страница поста показывает только первую страницу комментариев,
+        а «Показать ещё» догружает остальные"""
+        response = self.client.get(CommentPagesTests.POST_URL)
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), settings.COMMENTS_PER_PAGE)
+        cursor = response.context["comments_cursor"]
+        self.assertContains(response, f"?after={cursor}")
+        response = self.client.get(CommentPagesTests.COMMENTS_URL,
+                                   {"after": cursor, "format": "json"})
+        data = response.json()
+        self.assertEqual(len(data["comments"]), 5)
+        self.assertEqual(data["comments"][-1]["text"], "Комментарий 0")
+        self.assertIsNone(data["next"])
+
+    def test_comment_fragment_query_count(self):
+        """Фрагмент комментариев строится фиксированным числом запросов,
+        без отдельного запроса за автором каждого комментария"""
+        with self.assertNumQueries(2):
+            response = self.client.get(CommentPagesTests.COMMENTS_URL)
+        self.assertContains(response, "Комментарий",
+                            count=settings.COMMENTS_PER_PAGE)
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=const.AUTHOR_USERNAME)
+        cls.group = Group.objects.create(title=const.GROUP_TITLE,
+                                         slug=const.GROUP_SLUG)
+        cls.post = Post.objects.create(text=const.POST_TEXT,
+                                       author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_return_selected_fields(self):
+        urls = (
+            const.API_INDEX_URL,
+            reverse("api:group_posts", args=(const.GROUP_SLUG,)),
+            reverse("api:profile", args=(const.AUTHOR_USERNAME,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = Client().get(url, {"fields": "id,author,group"})
+                self.assertEqual(response.json(), {
+                    "results": [{"id": ApiTests.post.id,
+                                 "author": const.AUTHOR_USERNAME,
+                                 "group": const.GROUP_SLUG}],
+                    "next": None,
+                    "previous": None,
+                })
+        response = Client().get(const.API_INDEX_URL, {"fields": "secret"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_group_or_author_returns_404(self):
+        for url in (reverse("api:group_posts", args=("unknown",)),
+                    reverse("api:profile", args=("unknown",))):
+            with self.subTest(url=url):
+                response = Client().get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn("detail", response.json())
+
+    def test_unchanged_feed_returns_not_modified(self):
+        """Повторный запрос с ETag получает 304, пока лента или пост
+        не изменились"""
+        client = Client()
+        post_url = reverse("api:post", args=(ApiTests.post.id,))
+        for url in (const.API_INDEX_URL, post_url):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertTrue(response.has_header("Last-Modified"))
+                etag = response["ETag"]
+                self.assertEqual(
+                    client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+                Comment.objects.create(post=ApiTests.post,
+                                       author=ApiTests.author, text="Новый")
+                self.assertEqual(
+                    client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_follow_feed_changes_after_follow(self):
+        reader = User.objects.create_user(username=const.USERNAME)
+        client = Client()
+        self.assertEqual(client.get(const.API_FOLLOW_URL).status_code, 401)
+        client.force_login(reader)
+        response = client.get(const.API_FOLLOW_URL)
+        self.assertEqual(response.json()["results"], [])
+        Follow.objects.create(user=reader, author=ApiTests.author)
+        response = client.get(const.API_FOLLOW_URL,
+                              HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+
+class ConditionalPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=const.AUTHOR_USERNAME)
+        cls.group = Group.objects.create(title=const.GROUP_TITLE,
+                                         slug=const.GROUP_SLUG)
+        cls.post = Post.objects.create(text=const.POST_TEXT,
+                                       author=cls.author, group=cls.group)
+        cls.urls = (
+            const.HOME_URL,
+            const.GROUP_URL,
+            reverse("posts:profile", args=(const.AUTHOR_USERNAME,)),
+            reverse("posts:post", args=(const.AUTHOR_USERNAME, cls.post.id)),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_pages_are_public_and_revalidated(self):
+        """Анонимный посетитель получает 304, пока страница
+        не изменилась, и новую страницу после комментария"""
+        client = Client()
+        for url in ConditionalPagesTests.urls:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertIn("public", response["Cache-Control"])
+                self.assertIn("Cookie", response["Vary"])
+                etag = response["ETag"]
+                self.assertEqual(
+                    client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+                Comment.objects.create(post=ConditionalPagesTests.post,
+                                       author=ConditionalPagesTests.author,
+                                       text="Комментарий")
+                self.assertEqual(
+                    client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_follows_database_without_version_bump(self):
+        """ETag меняется после записи, которая не подняла версии
+        областей в этом процессе, как при записи в другом воркере"""
+        etags = {url: Client().get(url)["ETag"]
+                 for url in ConditionalPagesTests.urls}
+        # bulk_create не шлёт сигналов, поэтому версии остаются прежними
+        Post.objects.bulk_create([Post(text=const.POST_TEXT,
+                                       author=ConditionalPagesTests.author,
+                                       group=ConditionalPagesTests.group)])
+        Comment.objects.bulk_create([Comment(
+            post=ConditionalPagesTests.post,
+            author=ConditionalPagesTests.author, text="Комментарий")])
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = Client().get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_profile_etag(self):
+        reader = User.objects.create_user(username=const.USERNAME)
+        url = ConditionalPagesTests.urls[2]
+        etag = Client().get(url)["ETag"]
+        Follow.objects.create(user=reader, author=ConditionalPagesTests.author)
+        self.assertNotEqual(Client().get(url)["ETag"], etag)
+
+    def test_member_pages_are_private(self):
+        client = Client()
+        client.force_login(ConditionalPagesTests.author)
+        response = client.get(const.HOME_URL)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertFalse(response.has_header("ETag"))
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=const.AUTHOR_USERNAME)
+        cls.reader = User.objects.create_user(username=const.USERNAME)
+        cls.post = Post.objects.create(text=const.POST_TEXT,
+                                       author=cls.author)
+        cls.edit_url = reverse("posts:post_edit",
+                               args=(const.AUTHOR_USERNAME, cls.post.id))
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(PageCacheTests.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(PageCacheTests.reader)
+
+    def test_cached_page_fills_user_holes(self):
+        """Закэшированная страница не отрисовывается заново, но кнопки
+        и меню в ней соответствуют пользователю запроса"""
+        response = self.author_client.get(const.HOME_URL)
+        self.assertTemplateUsed(response, "index.html")
+        self.assertContains(response, PageCacheTests.edit_url)
+        response = self.reader_client.get(const.HOME_URL)
+        self.assertTemplateNotUsed(response, "index.html")
+        self.assertContains(response, const.POST_TEXT)
+        self.assertNotContains(response, PageCacheTests.edit_url)
+        self.assertContains(response, "Избранные авторы")
+        response = Client().get(const.HOME_URL)
+        self.assertContains(response, const.LOGIN_URL)
+        self.assertNotContains(response, "Избранные авторы")
+
+    def test_unrelated_params_share_cached_page(self):
+        """Параметры, которых лента не читает, не создают
+        отдельных страниц в кэше"""
+        self.reader_client.get(const.HOME_URL, {"utm_source": "mail"})
+        response = self.reader_client.get(const.HOME_URL,
+                                          {"utm_source": "news"})
+        self.assertTemplateNotUsed(response, "index.html")
+        response = self.reader_client.get(const.HOME_URL, {"page": 2})
+        self.assertTemplateUsed(response, "index.html")
+
+    def test_follow_button_matches_user(self):
+        url = reverse("posts:profile", args=(const.AUTHOR_USERNAME,))
+        self.reader_client.get(url)
+        Follow.objects.create(user=PageCacheTests.reader,
+                              author=PageCacheTests.author)
+        self.assertContains(self.reader_client.get(url), const.UNFOLLOW_URL)
+        self.assertContains(self.author_client.get(url), "(Это Вы)")
@@ -0,0 +1,85 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, connection, transaction
+from sorl.thumbnail import get_thumbnail
+
+from yatube.settings import THUMBNAIL_ASYNC, THUMBNAIL_WORKERS
+
+from . import feed_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Карточка ленты 960x339; варианты нескольких ширин с тем же
+# соотношением сторон, в WebP и в JPEG для старых браузеров
+WIDTHS = (320, 640, 960)
+ASPECT_RATIO = 339 / 960
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+OPTIONS = {"crop": "50%", "padding": True}
+
+_executor = None
+
+
+def schedule(post_id):
+    """Ставит построение вариантов картинки в очередь после фиксации
+    транзакции, чтобы фоновый поток увидел сохранённый пост. Базу SQLite
+    в памяти потоки надёжно разделять не могут, с ней миниатюра
+    строится сразу"""
+    in_memory = getattr(connection, "is_in_memory_db", lambda: False)()
+    if THUMBNAIL_ASYNC and not in_memory:
+        transaction.on_commit(lambda: _get_executor().submit(_run, post_id))
+    else:
+        _generate_logged(post_id)
+
+
+def generate(post_id):
+    """Строит варианты картинки поста и сохраняет их список в посте.
+    Возвращает словарь формат -> [(ширина, файл), ...] или None"""
+    rows = Post.objects.filter(pk=post_id).values_list(
+        "image", "group_id", "author_id")
+    if not rows or not rows[0][0]:
+        return None
+    image, group_id, author_id = rows[0]
+    variants = {}
+    for key, image_format in FORMATS.items():
+        variants[key] = []
+        for width in WIDTHS:
+            geometry = f"{width}x{round(width * ASPECT_RATIO)}"
+            thumbnail = get_thumbnail(image, geometry, format=image_format,
+                                      **OPTIONS)
+            if not thumbnail.exists():
+                logger.warning("Не удалось построить миниатюру для %s",
+                               image)
+                return None
+            variants[key].append((width, thumbnail.name))
+    updated = Post.objects.filter(pk=post_id, image=image).update(
+        image_variants=json.dumps(variants))
+    if updated:
+        feed_cache.bump(*feed_cache.post_scopes(group_id, author_id))
+    return variants
+
+
+def _run(post_id):
+    close_old_connections()
+    try:
+        return _generate_logged(post_id)
+    finally:
+        close_old_connections()
+
+
+def _generate_logged(post_id):
+    """Ошибка построения миниатюры не должна мешать сохранению поста"""
+    try:
+        return generate(post_id)
+    except Exception:
+        logger.exception("Ошибка построения миниатюры поста %s", post_id)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS,
+                                       thread_name_prefix="thumbnails")
+    return _executor
@@ -0,0 +1,64 @@
+from django.db import connection
+from django.db.models import F
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+# Порядок ленты подписок: по полям записи ленты, чтобы выборка
+# шла по индексу (user, -pub_date, -post) без досортировки
+FEED_ORDERING = ("-feed_date", "-feed_post")
+
+
+def feed(user):
+    """Посты ленты подписок пользователя с датой и id поста
+    из записей ленты для сортировки по FEED_ORDERING"""
+    return Post.objects.filter(timeline_entries__user=user).annotate(
+        feed_date=F("timeline_entries__pub_date"),
+        feed_post=F("timeline_entries__post_id"))
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам всех подписчиков автора"""
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list("user_id", flat=True)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def backfill(follow):
+    """Добавляет в ленту подписчика все посты автора"""
+    posts = Post.objects.filter(
+        author_id=follow.author_id).values_list("id", "pub_date")
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=follow.user_id, post_id=post_id,
+                       pub_date=pub_date)
+         for post_id, pub_date in posts],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def trim(follow):
+    """Убирает из ленты подписчика посты автора, от которого он отписался"""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id,
+        post__author_id=follow.author_id).delete()
+
+
+def rebuild():
+    """Пересобирает ленты всех пользователей по текущим подпискам
+    одним INSERT ... SELECT, без выборки строк в Python"""
+    TimelineEntry.objects.all().delete()
+    entry, follow, post = (model._meta for model in
+                           (TimelineEntry, Follow, Post))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {entry.db_table} (user_id, post_id, pub_date) "
+            f"SELECT f.user_id, p.id, p.pub_date "
+            f"FROM {follow.db_table} f "
+            f"INNER JOIN {post.db_table} p ON p.author_id = f.author_id"
+        )
@@ -0,0 +1,128 @@
+"""Перенос данных между экземплярами Yatube в формате JSON Lines.
+
+Каждая строка - одна запись вида ``{"model": "post", "id": 1, ...}``.
+Модели выгружаются в порядке зависимостей (пользователи, группы,
+посты, комментарии, подписки) и сохраняют свои первичные ключи,
+поэтому загрузка идёт пачками INSERT (см. bulk_insert) без поиска
+связанных объектов, а повторная загрузка тех же строк ничего
+не дублирует."""
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, router, transaction
+from django.db.models import AutoField
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 2000
+
+MODELS = {
+    "user": (User, ("id", "username", "password", "email", "first_name",
+                    "last_name", "is_active", "is_staff", "is_superuser",
+                    "date_joined", "last_login")),
+    "group": (Group, ("id", "title", "slug", "description")),
+    "post": (Post, ("id", "text", "pub_date", "author_id", "group_id",
+                    "image")),
+    "comment": (Comment, ("id", "post_id", "author_id", "text", "created")),
+    "follow": (Follow, ("id", "user_id", "author_id")),
+}
+
+
+class TransferError(Exception):
+    pass
+
+
+def export_records(stream, batch_size=BATCH_SIZE):
+    """Пишет все записи в поток построчно; таблицы читаются
+    курсором пачками по batch_size строк. Возвращает число
+    выгруженных записей по моделям"""
+    totals = {}
+    for label, (model, fields) in MODELS.items():
+        rows = model.objects.order_by("pk").values_list(*fields)
+        totals[label] = 0
+        for row in rows.iterator(chunk_size=batch_size):
+            record = {"model": label, **dict(zip(fields, row))}
+            stream.write(json.dumps(record, cls=DjangoJSONEncoder,
+                                    ensure_ascii=False))
+            stream.write("\n")
+            totals[label] += 1
+    return totals
+
+
+def import_records(lines, batch_size=BATCH_SIZE, skip=0, progress=None):
+    """Загружает записи из итератора строк.
+
+    Пачка сохраняется в своей транзакции, после чего вызывается
+    ``progress(label, loaded, line_number)`` - по номеру строки загрузку
+    можно продолжить, передав его в skip. Возвращает число
+    загруженных записей по моделям"""
+    totals = {}
+    batch = []
+    label = None
+    line_number = 0
+    for line_number, line in enumerate(lines, 1):
+        if line_number <= skip or not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            record_label = record.pop("model")
+            model, fields = MODELS[record_label]
+        except (ValueError, KeyError) as error:
+            raise TransferError(
+                f"Строка {line_number}: неверная запись ({error})")
+        if batch and (record_label != label or len(batch) >= batch_size):
+            _flush(label, batch, totals, line_number - 1, progress)
+            batch = []
+        label = record_label
+        batch.append(model(**{field: record.get(field)
+                              for field in fields if field in record}))
+    if batch:
+        _flush(label, batch, totals, line_number, progress)
+    _reset_sequences()
+    return totals
+
+
+def _flush(label, batch, totals, line_number, progress):
+    model = MODELS[label][0]
+    with transaction.atomic():
+        bulk_insert(model, batch, ignore_conflicts=True)
+    totals[label] = totals.get(label, 0) + len(batch)
+    if progress is not None:
+        progress(label, totals[label], line_number)
+
+
+def bulk_insert(model, objs, ignore_conflicts=False):
+    """Вставляет объекты пачками, как bulk_create, но значения полей
+    пишутся как есть, как при loaddata: auto_now_add не заменяет даты
+    из выгрузки текущим временем. Поля модели не меняются, поэтому
+    сохранения в других потоках процесса работают как обычно.
+    Первичные ключи новых объектов не заполняются"""
+    objs = list(objs)
+    if not objs:
+        return
+    fields = model._meta.concrete_fields
+    if objs[0].pk is None:
+        fields = [field for field in fields
+                  if not isinstance(field, AutoField)]
+    using = router.db_for_write(model)
+    batch_size = max(
+        connections[using].ops.bulk_batch_size(fields, objs), 1)
+    for start in range(0, len(objs), batch_size):
+        model._base_manager.using(using)._insert(
+            objs[start:start + batch_size], fields=fields, raw=True,
+            ignore_conflicts=ignore_conflicts)
+
+
+def _reset_sequences():
+    """После вставки с явными id счётчики автоинкремента
+    (в PostgreSQL - последовательности) должны продолжить с максимума"""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [model for model, fields in MODELS.values()])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, ImageOps
+
+MEGABYTE = 1024 * 1024
+
+
+class UploadRejected(Exception):
+    pass
+
+
+class RejectedUpload(SimpleUploadedFile):
+    """Пустой файл на месте отклонённой загрузки; PostForm
+    превращает его в ошибку поля"""
+
+    def __init__(self, name, error):
+        super().__init__(name, b"")
+        self.error = error
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку во временный файл по частям и прекращает приём,
+    как только превышен MAX_IMAGE_UPLOAD_SIZE. Готовую картинку
+    проверяет на число пикселей, очищает от EXIF и уменьшает до
+    MAX_IMAGE_DIMENSION по большей стороне"""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.error = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.MAX_IMAGE_UPLOAD_SIZE:
+            limit = settings.MAX_IMAGE_UPLOAD_SIZE / MEGABYTE
+            self.error = f"Размер файла не должен превышать {limit:g} МБ"
+            self.file.close()
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if self.error:
+            return RejectedUpload(self.file_name, self.error)
+        uploaded = super().file_complete(file_size)
+        try:
+            prepare_image(uploaded)
+        except UploadRejected as error:
+            uploaded.close()
+            return RejectedUpload(self.file_name, str(error))
+        return uploaded
+
+
+def prepare_image(uploaded):
+    """Проверяет размеры картинки по заголовку, не декодируя её,
+    и при необходимости перекодирует без метаданных и в меньшем размере.
+    Не картинки пропускает как есть - их отклонит ImageField"""
+    try:
+        image = Image.open(uploaded)
+    except (OSError, Image.DecompressionBombError):
+        uploaded.seek(0)
+        return
+    width, height = image.size
+    if width * height > settings.MAX_IMAGE_PIXELS:
+        limit = settings.MAX_IMAGE_PIXELS / 1_000_000
+        raise UploadRejected(
+            f"Картинка не должна быть больше {limit:g} мегапикселей")
+    max_side = settings.MAX_IMAGE_DIMENSION
+    oversized = max(width, height) > max_side
+    if getattr(image, "is_animated", False) or not (
+            oversized or image.getexif()):
+        uploaded.seek(0)
+        return
+    image_format = image.format
+    if oversized:
+        # JPEG декодируется сразу в уменьшенном масштабе
+        image.draft(image.mode, (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side))
+    uploaded.seek(0)
+    uploaded.truncate()
+    image.info.pop("exif", None)
+    options = {"quality": 90} if image_format == "JPEG" else {}
+    image.save(uploaded, format=image_format, exif=b"", **options)
+    uploaded.size = uploaded.tell()
+    uploaded.seek(0)
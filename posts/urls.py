@@ -9,12 +9,17 @@ urlpatterns = [
     path("group/<slug:slug>/", views.group_posts, name="group_posts"),
     path("my_follows/", views.my_follows, name="my_follows"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("popular/", views.popular, name="popular"),
+    path("search/", views.search, name="search"),
     path("<str:username>/<int:post_id>/edit/",
          views.post_edit,
          name="post_edit"),
     path("<str:username>/<int:post_id>/comment/",
          views.add_comment,
          name="add_comment"),
+    path("<str:username>/<int:post_id>/comments/",
+         views.post_comments,
+         name="post_comments"),
     path("", views.index, name="index"),
     path("<str:username>/follow/",
          views.profile_follow,
@@ -1,36 +1,82 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 
-from yatube.settings import PAGINATOR_NUMBER
+from yatube.settings import COMMENTS_PER_PAGE, PAGINATOR_NUMBER
 
-from .decorators import check_user_is_author
+from . import conditional, timeline
+from .decorators import check_user_is_author, public_page
+from .feed_cache import ALL_POSTS, author_scope, group_scope
 from .forms import CommentForm, PostForm
 from .models import Comment, Follow, Group, Post
+from .page_cache import page_cache
+from .paginator import CursorPaginator, page_number
+from .search import search_posts
+from .stats import get_stats
 
 User = get_user_model()
 
 
+@public_page(conditional.scopes_etag(conditional.index_scopes,
+                                     conditional.index_state),
+             conditional.index_last_modified)
+@page_cache(conditional.index_scopes)
 def index(request):
-    post_list = Post.objects.prefetch_related("author",
-                                              "group").all()
-    paginator = Paginator(post_list, PAGINATOR_NUMBER)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    context = {"page": page, "path": "home"}
+    post_list = Post.objects.select_related("author",
+                                            "group").all()
+    paginator = CursorPaginator(post_list, PAGINATOR_NUMBER)
+    page = paginator.paginate(request.GET)
+    context = {"page": page, "path": "home", "feed_scopes": [ALL_POSTS]}
     return render(request, "index.html", context)
 
 
+@public_page(conditional.scopes_etag(conditional.group_scopes,
+                                     conditional.group_state),
+             conditional.group_last_modified)
+@page_cache(conditional.group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.prefetch_related("author",
-                                             "group").all()
-    paginator = Paginator(post_list, PAGINATOR_NUMBER)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    return render(request, "group.html", {"group": group, "page": page})
+    post_list = group.posts.select_related("author",
+                                           "group").all()
+    paginator = CursorPaginator(post_list, PAGINATOR_NUMBER)
+    page = paginator.paginate(request.GET)
+    context = {
+        "group": group,
+        "page": page,
+        "feed_scopes": [group_scope(group.id)]
+    }
+    return render(request, "group.html", context)
+
+
+def popular(request):
+    post_list = Post.objects.select_related("author", "group").filter(
+        popularity__isnull=False).annotate(
+            score=F("popularity__score"),
+            score_post=F("popularity__post"))
+    paginator = CursorPaginator(post_list, PAGINATOR_NUMBER,
+                                ordering=("-score", "-score_post"))
+    page = paginator.paginate(request.GET)
+    return render(request, "popular.html", {"page": page})
+
+
+def search(request):
+    query = request.GET.get("q", "").strip()
+    number = page_number(request.GET.get("page"))
+    ids = search_posts(query, (number - 1) * PAGINATOR_NUMBER,
+                       PAGINATOR_NUMBER + 1)
+    found = Post.objects.select_related("author", "group").in_bulk(
+        ids[:PAGINATOR_NUMBER])
+    context = {
+        "query": query,
+        "posts": [found[pk] for pk in ids[:PAGINATOR_NUMBER] if pk in found],
+        "number": number,
+        "has_next": len(ids) > PAGINATOR_NUMBER,
+    }
+    return render(request, "search.html", context)
 
 
 @login_required
@@ -41,59 +87,104 @@ def new_post(request):
         group = form.cleaned_data["group"]
         image = form.cleaned_data["image"]
         post = Post(text=text, group=group, author=request.user, image=image)
-        post.save()
+        with transaction.atomic():
+            post.save()
         return redirect(reverse("posts:index"))
     return render(request, "new_post.html", {"form": form})
 
 
+@public_page(conditional.scopes_etag(conditional.profile_scopes,
+                                     conditional.profile_state),
+             conditional.profile_last_modified)
+@page_cache(conditional.profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username__iexact=username)
+    author = get_object_or_404(User, username__ciexact=username)
     post_list = Post.objects.select_related("author",
                                             "group").filter(author=author)
-    paginator = Paginator(post_list, PAGINATOR_NUMBER)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            author=author, user=request.user).exists()
-    context = {"author": author, "page": page, "following": following}
-    if request.user == author:
-        context["path"] = "my_profile"
+    paginator = CursorPaginator(post_list, PAGINATOR_NUMBER)
+    page = paginator.paginate(request.GET)
+    context = {
+        "author": author,
+        "stats": get_stats(author),
+        "page": page,
+        "profile_username": author.username,
+        "feed_scopes": [author_scope(author.id)]
+    }
     return render(request, "profile.html", context)
 
 
+@public_page(conditional.scopes_etag(conditional.post_scopes,
+                                     conditional.post_state),
+             conditional.post_last_modified)
 def post_view(request, username, post_id):
-    author = User.objects.get(username__iexact=username)
+    author = User.objects.get(username__ciexact=username)
     post = get_object_or_404(Post, author=author, id=post_id)
     comment_form = CommentForm()
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            author=author, user=request.user).exists()
+    paginator = _comments_paginator(post)
+    comments = paginator.object_list[:COMMENTS_PER_PAGE]
+    comments_cursor = None
+    if post.comment_count > COMMENTS_PER_PAGE and comments:
+        comments_cursor = paginator.encode_cursor(comments[len(comments) - 1])
     context = {
         "author": author,
+        "stats": get_stats(author),
         "post": post,
         "comment_form": comment_form,
-        "following": following
+        "comments": comments,
+        "comments_cursor": comments_cursor,
     }
     return render(request, "post.html", context)
 
 
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев для кнопки «Показать ещё»:
+    HTML-фрагмент или, с ?format=json, JSON"""
+    post = get_object_or_404(Post.objects.select_related("author"),
+                             author__username__ciexact=username,
+                             id=post_id)
+    page = _comments_paginator(post).paginate(request.GET)
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "comments": [{
+                "id": comment.id,
+                "author": comment.author.username,
+                "text": comment.text,
+                "created": comment.created,
+            } for comment in page],
+            "next": page.next_cursor,
+        })
+    return render(request, "comment_list.html", {
+        "post": post,
+        "comments": page,
+        "comments_cursor": page.next_cursor,
+    })
+
+
+def _comments_paginator(post):
+    # id по возрастанию совпадает с порядком записей в индексе
+    # (post, -created), и сортировка не требует отдельного прохода
+    return CursorPaginator(post.comments.select_related("author"),
+                           COMMENTS_PER_PAGE,
+                           ordering=("-created", "id"))
+
+
 @check_user_is_author
 def post_edit(request, username, post_id):
     post = Post.objects.get(id=post_id)
-    if request.method == "POST":
-        form = PostForm(request.POST or None,
-                        files=request.FILES or None,
-                        instance=post)
-        if form.is_valid():
-            form.save()
-            return redirect(reverse(
-                "posts:post",
-                kwargs={"username": username, "post_id": post.id}
-            ))
-    form = PostForm(instance=post)
+    form = PostForm(request.POST or None,
+                    files=request.FILES or None,
+                    instance=post)
+    if request.method == "POST" and form.is_valid():
+        # Сохраняются только поля формы: счётчик комментариев,
+        # прочитанный в начале запроса, мог уже увеличиться
+        update_fields = list(form.Meta.fields)
+        if "image" in form.changed_data:
+            update_fields.append("image_variants")
+        form.save(commit=False).save(update_fields=update_fields)
+        return redirect(reverse(
+            "posts:post",
+            kwargs={"username": username, "post_id": post.id}
+        ))
     return render(request, "new_post.html", {"form": form, "post": post})
 
 
@@ -119,33 +210,27 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    follows = Follow.objects.filter(user=request.user)
-    authors = User.objects.filter(following__in=follows)
-    posts = Post.objects.prefetch_related(
-        "author",
-        "group").filter(author__in=authors)
-    paginator = Paginator(posts, PAGINATOR_NUMBER)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    posts = timeline.feed(request.user).select_related("author", "group")
+    paginator = CursorPaginator(posts, PAGINATOR_NUMBER,
+                                ordering=timeline.FEED_ORDERING)
+    page = paginator.paginate(request.GET)
     return render(request, "follow.html", {"page": page})
 
 
 @login_required
 def profile_follow(request, username):
-    author = User.objects.get(username=username)
-    follow_exists = Follow.objects.filter(author=author,
-                                          user=request.user).exists()
-    if request.user != author and not follow_exists:
-        follow = Follow.objects.create(author=author, user=request.user)
-        follow.save()
+    author = get_object_or_404(User, username=username)
+    if request.user != author:
+        with transaction.atomic():
+            Follow.objects.get_or_create(author=author, user=request.user)
     return redirect(reverse("posts:profile", args=(username,)))
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = User.objects.get(username=username)
-    follow = Follow.objects.get(author=author, user=request.user)
-    follow.delete()
+    author = get_object_or_404(User, username=username)
+    with transaction.atomic():
+        Follow.objects.filter(author=author, user=request.user).delete()
     return redirect(reverse("posts:profile", args=(username,)))
 
 
@@ -153,9 +238,8 @@ def profile_unfollow(request, username):
 def my_follows(request):
     follows = Follow.objects.filter(user=request.user)
     users = User.objects.filter(following__in=follows)
-    print('users:', users)
-    paginator = Paginator(users, PAGINATOR_NUMBER)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    paginator = CursorPaginator(users, PAGINATOR_NUMBER,
+                                ordering=("username", "id"))
+    page = paginator.paginate(request.GET)
     context = {"page": page, "path": "my_follows"}
     return render(request, "follow_list.html", context)
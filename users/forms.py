@@ -12,7 +12,7 @@ class CreationForm(UserCreationForm):
 
     def clean_username(self):
         data = self.cleaned_data["username"]
-        if User.objects.filter(username__iexact=data).exists():
+        if User.objects.filter(username__ciexact=data).exists():
             raise ValidationError("Пользователь с таким именем уже"
                                   "существует. Пожалуйста, придумайте"
                                   "другой логин.")
@@ -0,0 +1,19 @@
+from django.db.models import CharField, Lookup
+
+
+@CharField.register_lookup
+class CaseInsensitiveExact(Lookup):
+    """Сравнение без учёта регистра, которое записывается так же,
+    как индекс auth_user_username_ci, и потому использует его
+    (в отличие от iexact, который в SQLite превращается в LIKE)"""
+    lookup_name = "ciexact"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"UPPER({lhs}) = UPPER({rhs})", lhs_params + rhs_params
+
+    def as_sqlite(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} = {rhs} COLLATE NOCASE", lhs_params + rhs_params
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+INDEX_NAME = 'auth_user_username_ci'
+
+CREATE_INDEX = {
+    'sqlite': (f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+               'ON auth_user (username COLLATE NOCASE)'),
+    'postgresql': (f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+                   'ON auth_user (UPPER(username))'),
+}
+
+
+def create_index(apps, schema_editor):
+    sql = CREATE_INDEX.get(schema_editor.connection.vendor)
+    if sql:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_INDEX:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
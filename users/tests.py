@@ -1,3 +1,35 @@
-# from django.test import TestCase
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from .forms import CreationForm
+
+User = get_user_model()
+
+
+class CaseInsensitiveUsernameTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="TestUser")
+
+    def test_lookup_ignores_case(self):
+        self.assertEqual(User.objects.get(username__ciexact="testuser"),
+                         CaseInsensitiveUsernameTests.user)
+
+    def test_signup_rejects_username_in_other_case(self):
+        form = CreationForm(data={
+            "username": "TESTUSER",
+            "password1": "Sup3r-secret-pass",
+            "password2": "Sup3r-secret-pass",
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn("username", form.errors)
+
+    @skipUnless(connection.vendor == "sqlite",
+                "Проверяется план запросов SQLite")
+    def test_lookup_uses_index(self):
+        plan = User.objects.filter(username__ciexact="testuser").explain()
+        self.assertIn("auth_user_username_ci", plan)
@@ -0,0 +1,45 @@
+import random
+import threading
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def use_replica(alias):
+    """Направляет чтения текущего потока на реплику alias
+    (None - обратно на основную базу)"""
+    _state.replica = alias
+    _state.wrote = False
+
+
+def wrote():
+    """Была ли запись в основную базу с последнего use_replica"""
+    return getattr(_state, "wrote", False)
+
+
+def choose_replica():
+    replicas = getattr(settings, "DATABASE_REPLICAS", ())
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    """Чтения запросов, помеченных ReplicaRoutingMiddleware, идут
+    на выбранную для запроса реплику; все записи и остальные чтения -
+    на основную базу. Миграции применяются только к основной базе,
+    реплики получают схему вместе с данными"""
+
+    def db_for_read(self, model, **hints):
+        return getattr(_state, "replica", None) or "default"
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in getattr(settings, "REPLICA_PIN_APPS",
+                                            ()):
+            _state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
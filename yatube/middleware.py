@@ -0,0 +1,159 @@
+import functools
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+from . import db_router
+
+logger = logging.getLogger("yatube.metrics")
+
+_state = threading.local()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.statements[sql] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.statements.values())
+
+    @property
+    def duplicates(self):
+        """Повторные выполнения одного и того же SQL (признак N+1)"""
+        return {sql: count for sql, count in self.statements.items()
+                if count > 1}
+
+
+def _instrument_templates():
+    """Оборачивает Template.render, чтобы учитывать время рендеринга;
+    вложенные шаблоны (include, extends) в сумму не добавляются"""
+    original = Template.render
+    if getattr(original, "instrumented", False):
+        return
+
+    @functools.wraps(original)
+    def render(self, context):
+        metrics = getattr(_state, "metrics", None)
+        if metrics is None:
+            return original(self, context)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - start
+
+    render.instrumented = True
+    Template.render = render
+
+
+class RequestMetricsMiddleware:
+    """Замеряет общее время обработки запроса, время рендеринга шаблонов,
+    время и число SQL-запросов и находит повторяющиеся запросы.
+
+    Результат отдаётся в заголовке Server-Timing и пишется строкой JSON
+    в лог ``yatube.metrics``. Доля замеряемых запросов задаётся
+    настройкой REQUEST_METRICS_SAMPLE_RATE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _instrument_templates()
+
+    def __call__(self, request):
+        sample_rate = getattr(settings, "REQUEST_METRICS_SAMPLE_RATE", 0)
+        if sample_rate <= 0 or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        _state.metrics = metrics
+        start = time.perf_counter()
+        try:
+            # Чтения могут идти на реплики, поэтому запросы считаются
+            # во всех соединениях, а не только в основном
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _state.metrics = None
+        total = time.perf_counter() - start
+
+        duplicates = metrics.duplicates
+        response["Server-Timing"] = ", ".join((
+            f"total;dur={total * 1000:.1f}",
+            f"tpl;dur={metrics.template_time * 1000:.1f}",
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{metrics.query_count} queries"',
+            f'dup;desc="{sum(duplicates.values())} duplicated"',
+        ))
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "view": getattr(request.resolver_match, "view_name", None),
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            "template_ms": round(metrics.template_time * 1000, 1),
+            "db_ms": round(metrics.db_time * 1000, 1),
+            "queries": metrics.query_count,
+            "duplicated": [
+                {"sql": sql, "count": count}
+                for sql, count in Counter(duplicates).most_common(5)
+            ],
+        }, ensure_ascii=False))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Отправляет чтения GET-запросов к представлениям из REPLICA_VIEWS
+    на реплику базы.
+
+    После запроса, который что-то записал в основную базу, ставится
+    cookie REPLICA_PIN_COOKIE на REPLICA_PIN_SECONDS: пока она есть,
+    клиент читает только из основной базы и видит свои изменения,
+    даже если реплика ещё отстаёт."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db_router.use_replica(None)
+        try:
+            response = self.get_response(request)
+            wrote = db_router.wrote()
+        finally:
+            db_router.use_replica(None)
+        if wrote:
+            response.set_cookie(settings.REPLICA_PIN_COOKIE, "1",
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite="Lax")
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in ("GET", "HEAD")
+                and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+                and request.resolver_match.view_name
+                in settings.REPLICA_VIEWS):
+            db_router.use_replica(db_router.choose_replica())
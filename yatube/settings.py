@@ -4,6 +4,16 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def env_flag(name, default=False):
+    """Флаг из переменной окружения: 1/true/yes/on - включён,
+    любое другое значение - выключен, без переменной - default"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -15,7 +25,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = os.environ.get('SECRET_KEY', '---')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = os.environ.get('DEBUG', True)
+DEBUG = env_flag('DEBUG', True)
 
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', ['localhost', '127.0.0.1'])
 
@@ -36,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.middleware.RequestMetricsMiddleware',
+    'yatube.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,14 +60,29 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+
+# Кэширующий загрузчик разбирает каждый шаблон один раз за жизнь процесса,
+# а wsgi.py при запуске заранее разбирает все шаблоны проекта. При разработке
+# (DEBUG) он выключен, чтобы правки шаблонов были видны без перезапуска;
+# TEMPLATE_CACHE=1 или TEMPLATE_CACHE=0 задаёт его явно
+TEMPLATE_CACHE = env_flag('TEMPLATE_CACHE', not DEBUG)
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR,
                  os.path.join(BASE_DIR, "templates/posts"),
                  os.path.join(BASE_DIR, "templates/include")],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'yatube.context_processors.year',
                 'django.template.context_processors.debug',
@@ -80,6 +107,59 @@ DATABASES = {
     }
 }
 
+# SQLITE_TUNING=1 включает профиль для работы под нагрузкой:
+# WAL (чтения не ждут записей), synchronous=NORMAL, кэш страниц 64 МБ,
+# mmap 256 МБ, ожидание блокировки до 5 секунд и постоянные соединения
+if env_flag('SQLITE_TUNING'):
+    DATABASES['default'].update({
+        'ENGINE': 'yatube.sqlite',
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 600)),
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -64000,
+            'mmap_size': 268435456,
+            'busy_timeout': 5000,
+            'temp_store': 'MEMORY',
+        },
+        'TRANSACTION_MODE': 'IMMEDIATE',
+    })
+
+# Реплики только для чтения: пути к файлам через запятую в DATABASE_REPLICAS.
+# Чтения представлений из REPLICA_VIEWS идут на случайную реплику,
+# после записи клиент REPLICA_PIN_SECONDS секунд читает из основной базы
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(
+        None, os.environ.get('DATABASE_REPLICAS', '').split(','))):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['yatube.db_router.ReplicaRouter']
+
+REPLICA_VIEWS = [
+    'posts:index',
+    'posts:group_posts',
+    'posts:profile',
+    'posts:post',
+    'posts:follow_index',
+    'posts:my_follows',
+    'api:index',
+    'api:group_posts',
+    'api:profile',
+    'api:post',
+    'api:follow_index',
+]
+REPLICA_PIN_COOKIE = 'pin_primary'
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+# Закрепляют клиента за основной базой только записи моделей этих
+# приложений: запись в кэш (CACHE_BACKEND=db) содержимого не меняет
+REPLICA_PIN_APPS = ['posts', 'auth', 'sessions']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -124,6 +204,18 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки пишутся во временный файл по частям; картинки больше
+# MAX_IMAGE_UPLOAD_SIZE байт или MAX_IMAGE_PIXELS пикселей отклоняются,
+# а больше MAX_IMAGE_DIMENSION по большей стороне - уменьшаются
+FILE_UPLOAD_HANDLERS = ['posts.uploads.BoundedImageUploadHandler']
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+MAX_IMAGE_DIMENSION = 2560
+# Картинка без постов удаляется, только если её не сохраняли и не
+# загружали повторно последние IMAGE_ORPHAN_GRACE секунд: одинаковая
+# загрузка получает тот же файл раньше, чем её пост попадёт в базу
+IMAGE_ORPHAN_GRACE = 5
+
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = 'posts:index'
 
@@ -132,9 +224,78 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 PAGINATOR_NUMBER = 10
+COMMENTS_PER_PAGE = 20
+
+# Кэш лент: сколько секунд фрагмент считается свежим при неизменной
+# версии, сколько хранится устаревшим (отдаётся, пока его пересчитывают)
+# и на сколько берётся блокировка пересчёта
+FEED_CACHE_FRESH = 60 * 5
+FEED_CACHE_STALE = 60 * 60 * 24
+FEED_CACHE_LOCK = 10
+
+# Страницы лент и постов для анонимных посетителей помечаются как public:
+# обратный прокси отдаёт их из своего кэша PUBLIC_PAGE_MAX_AGE секунд,
+# а затем перепроверяет по ETag и получает 304, если ничего не изменилось
+PUBLIC_PAGE_MAX_AGE = int(os.environ.get('PUBLIC_PAGE_MAX_AGE', 10))
+
+# Лента популярного: вклад поста и каждого комментария убывает
+# в e раз за POPULAR_DECAY_HOURS; рейтинги пересчитываются командой
+# recompute_popular для постов, опубликованных или обсуждавшихся
+# за последние POPULAR_WINDOW_DAYS дней
+POPULAR_DECAY_HOURS = 24
+POPULAR_WINDOW_DAYS = 14
+POPULAR_FOLLOWER_WEIGHT = 1.0
+
+# Миниатюры картинок постов строятся в фоновых потоках после сохранения
+# поста; THUMBNAIL_ASYNC = False строит их сразу, в потоке запроса
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+
+# Бэкенд кэша выбирается переменной окружения CACHE_BACKEND:
+# locmem - память процесса (у каждого воркера свой кэш),
+# file - каталог CACHE_LOCATION, общий для воркеров одной машины,
+# db - таблица CACHE_LOCATION в основной базе
+# (создаётся командой python manage.py createcachetable)
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION',
+                                   os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'yatube_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
 
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    'default': CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')],
+}
+
+# Доля запросов, для которых RequestMetricsMiddleware
+# пишет Server-Timing и строку в лог yatube.metrics (от 0 до 1)
+REQUEST_METRICS_SAMPLE_RATE = float(
+    os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 0)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yatube.metrics': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
@@ -0,0 +1,22 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Бэкенд SQLite с настройками для работы под нагрузкой.
+
+    PRAGMAS из настроек базы выполняются при каждом новом соединении
+    (journal_mode=WAL позволяет читать во время записи).
+    TRANSACTION_MODE="IMMEDIATE" берёт блокировку записи в начале
+    transaction.atomic, а не при первой записи: иначе транзакция,
+    начавшаяся с чтения, получает "database is locked" без ожидания
+    busy_timeout, если другой поток успел записать раньше неё."""
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for pragma, value in self.settings_dict.get("PRAGMAS", {}).items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict.get("TRANSACTION_MODE")
+        self.cursor().execute(f"BEGIN {mode}" if mode else "BEGIN")
@@ -0,0 +1,52 @@
+"""Предварительный разбор шаблонов проекта.
+
+С кэширующим загрузчиком шаблон разбирается при первом обращении,
+и первые запросы после запуска воркера платят за чтение файлов
+и разбор каждого {% include %}. precompile делает это заранее."""
+import logging
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = (".html", ".txt")
+
+
+def template_names(engine):
+    """Имена всех шаблонов проекта относительно каталогов поиска:
+    DIRS и каталогов templates приложений проекта. Шаблон из вложенного
+    каталога, который сам указан в DIRS, попадает под обоими именами"""
+    directories = list(engine.dirs)
+    for config in apps.get_app_configs():
+        directory = os.path.join(config.path, "templates")
+        if (config.path.startswith(str(settings.BASE_DIR))
+                and os.path.isdir(directory)):
+            directories.append(directory)
+    names = set()
+    for directory in directories:
+        for root, dirs, files in os.walk(directory):
+            for file in files:
+                if file.endswith(EXTENSIONS):
+                    path = os.path.relpath(os.path.join(root, file),
+                                           directory)
+                    names.add(path.replace(os.sep, "/"))
+    return sorted(names)
+
+
+def precompile(engine=None):
+    """Разбирает все шаблоны проекта; с кэширующим загрузчиком
+    они остаются в памяти процесса. Возвращает число шаблонов"""
+    if engine is None:
+        engine = engines["django"].engine
+    compiled = 0
+    for name in template_names(engine):
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError as error:
+            logger.warning("Шаблон %s не разобран: %s", name, error)
+        else:
+            compiled += 1
+    return compiled
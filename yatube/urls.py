@@ -9,6 +9,7 @@ urlpatterns = [
     path("auth/", include("users.urls", namespace='users')),
     path("auth/", include("django.contrib.auth.urls")),
     path("admin/", admin.site.urls),
+    path("api/", include("posts.api_urls", namespace="api")),
     path("", include("posts.urls", namespace='posts')),
 ]
 